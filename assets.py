@@ -0,0 +1,88 @@
+import os
+import threading
+import pygame
+from cache import LRUCache
+
+IMAGES_PATH = 'images'
+BACKGROUND = os.path.join(IMAGES_PATH, 'background.png')
+WALL = os.path.join(IMAGES_PATH, 'wall.png')
+ENEMY = os.path.join(IMAGES_PATH, 'enemy.png')
+PLAYER_SHEET = os.path.join(IMAGES_PATH, 'player.gif')
+ALL_IMAGES = (BACKGROUND, WALL, ENEMY, PLAYER_SHEET)
+
+
+class AssetManager:
+    # Кожен файл завантажується один раз і лише при першому використанні.
+    # Масштабовані варіанти та кадри анімацій спільні для всіх, хто їх використовує
+    def __init__(self, scaled_cache_size=64):
+        self.raw = {}
+        self.images = {}
+        self.scaled_cache = LRUCache(scaled_cache_size)
+        self.frames = {}
+        self.lock = threading.Lock()
+        self.preload_thread = None
+        self.loads = 0
+
+    def _load_raw(self, path):
+        with self.lock:
+            surface = self.raw.get(path)
+            if surface is None:
+                surface = pygame.image.load(path)
+                self.raw[path] = surface
+                self.loads += 1
+            return surface
+
+    def image(self, path, alpha=True):
+        # convert() потребує відкритого вікна, тому виконується вже в основному потоці
+        key = (path, alpha)
+        surface = self.images.get(key)
+        if surface is None:
+            raw = self._load_raw(path)
+            surface = raw.convert_alpha() if alpha else raw.convert()
+            self.images[key] = surface
+        return surface
+
+    def scaled(self, path, size, alpha=True, colorkey=None):
+        key = (path, tuple(size), alpha, colorkey)
+        surface = self.scaled_cache.get(key)
+        if surface is None:
+            surface = pygame.transform.scale(self.image(path, alpha), key[1])
+            surface = surface.convert_alpha() if alpha else surface.convert()
+            if colorkey is not None:
+                surface.set_colorkey(colorkey)
+            self.scaled_cache.put(key, surface)
+        return surface
+
+    def sprite_frames(self, path, directions=("down", "left", "right", "up"), columns=4):
+        # Кадри листа спрайтів: рядок - напрямок, стовпець - кадр анімації
+        key = (path, tuple(directions), columns)
+        animations = self.frames.get(key)
+        if animations is None:
+            sheet = self.image(path)
+            frame_width = sheet.get_width() // columns
+            frame_height = sheet.get_height() // len(directions)
+            animations = {}
+            for row, direction in enumerate(directions):
+                animations[direction] = [
+                    sheet.subsurface(pygame.Rect(col * frame_width, row * frame_height, frame_width, frame_height))
+                    for col in range(columns)
+                ]
+            self.frames[key] = animations
+        return animations
+
+    def preload(self, paths=ALL_IMAGES, background=True):
+        # Файли читаються з диска у фоновому потоці, поки гра ініціалізує БД
+        def load_all():
+            for path in paths:
+                if os.path.isfile(path):
+                    self._load_raw(path)
+
+        if not background:
+            load_all()
+            return None
+        self.preload_thread = threading.Thread(target=load_all, name="asset-preload", daemon=True)
+        self.preload_thread.start()
+        return self.preload_thread
+
+
+assets = AssetManager()
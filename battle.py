@@ -1,44 +1,67 @@
 from models import Player, Enemy
+from battle_engine import resolve, PLAYER_ATTACK_INTERVAL, ENEMY_ATTACK_INTERVAL, EXPERIENCE_RANGE
 import random
-import pygame
 
 class Battle:
     def __init__(self, game, enemy):
         self.game = game            
         self.player = game.player   
         self.enemy = enemy          
-        self.last_attack_time = pygame.time.get_ticks()
-        self.last_enemy_attack_time = pygame.time.get_ticks()
+        self.finished = False
+        # Удари - повторні таймери планувальника; при одночасних ударах першим б'є гравець
+        self.timers = [
+            game.scheduler.call_every(PLAYER_ATTACK_INTERVAL, self.player_attack, priority=0),
+            game.scheduler.call_every(ENEMY_ATTACK_INTERVAL, self.enemy_attack, priority=1)
+        ]
 
-    def update(self):
-        current_time = pygame.time.get_ticks()
+    def player_attack(self):
         # Гравець атакує ворога
-        if current_time - self.last_attack_time > 2000:
-            self.enemy.health -= self.player.attack
-            self.game.add_message(f"Ви нанесли {self.player.attack} шкоди ворогу. HP ворога: {max(self.enemy.health, 0)}")
-            self.last_attack_time = current_time
-
-            if self.enemy.health <= 0:
-                self.game.add_message("Ворог переможений!")
-                experience_gained = random.randint(10, 20)
-                self.player.experience += experience_gained
-                self.game.add_message(f"Ви отримали {experience_gained} досвіду.")
-                self.game.check_level_up()
-                self.game.random_stat_improvement()
-                self.enemy.delete()
-                self.game.enemies.remove(self.enemy)
-                self.player.save()
-                self.game.current_battle = None
-                self.game.game_state = 'exploration'
-                return
+        self.enemy.health -= self.player.attack
+        self.game.add_message(f"Ви нанесли {self.player.attack} шкоди ворогу. HP ворога: {max(self.enemy.health, 0)}")
+        if self.enemy.health <= 0:
+            self.victory(random.randint(*EXPERIENCE_RANGE))
 
+    def enemy_attack(self):
         # Ворог атакує гравця
-        if current_time - self.last_enemy_attack_time > 3000:
-            self.player.health -= self.enemy.attack
-            self.game.add_message(f"Ворог наніс {self.enemy.attack} шкоди вам. Ваше HP: {max(self.player.health, 0)}")
-            self.last_enemy_attack_time = current_time
+        self.player.health -= self.enemy.attack
+        self.game.add_message(f"Ворог наніс {self.enemy.attack} шкоди вам. Ваше HP: {max(self.player.health, 0)}")
+        if self.player.health <= 0:
+            self.defeat()
+
+    def finish(self):
+        self.finished = True
+        for timer in self.timers:
+            timer.cancel()
+
+    def skip(self):
+        # Пропуск битви: результат рахується одразу з поточних HP та атаки
+        self.finish()
+        result = resolve(self.player.health, self.player.attack, self.enemy.health, self.enemy.attack)
+        self.player.health = result.player_health
+        self.enemy.health = result.enemy_health
+        self.game.add_message(f"Битву пропущено ({len(result.events)} ударів, {result.duration // 1000} с).")
+        if result.winner == 'player':
+            self.victory(result.experience, result.improvement)
+        elif result.winner == 'enemy':
+            self.defeat()
+        return result
+
+    def victory(self, experience_gained, improvement=None):
+        self.finish()
+        self.game.add_message("Ворог переможений!")
+        self.player.experience += experience_gained
+        self.game.add_message(f"Ви отримали {experience_gained} досвіду.")
+        self.game.check_level_up()
+        self.game.random_stat_improvement(improvement)
+        self.enemy.delete()
+        self.game.remove_enemy(self.enemy)
+        self.game.player_store.flush(force=True)
+        self.game.current_battle = None
+        self.game.game_state = 'exploration'
 
-            if self.player.health <= 0:
-                self.game.add_message("Гравець зазнав поразки!")
-                self.game.game_state = 'game_over'
-                self.game.current_battle = None
+    def defeat(self):
+        self.finish()
+        self.game.add_message("Гравець зазнав поразки!")
+        self.game.player_store.flush(force=True)
+        self.game.game_state = 'game_over'
+        self.game.current_battle = None
@@ -0,0 +1,162 @@
+import argparse
+import json
+import math
+import random
+import time
+from collections import namedtuple
+import numpy as np
+
+PLAYER_ATTACK_INTERVAL = 2000
+ENEMY_ATTACK_INTERVAL = 3000
+EXPERIENCE_RANGE = (10, 20)
+MAX_LEVEL = 100
+
+# Нагорода за перемогу: (характеристика, значення, повідомлення)
+STAT_IMPROVEMENTS = [
+    ('attack', 2, "Ви отримали +2 до атаки!"),
+    ('defense', 1, "Ви отримали +1 до захисту!"),
+    ('health_restore', 25, "Ви відновили 25 HP!"),
+    ('max_health', 10, "Ваше максимальне HP збільшено на 10!")
+]
+
+BattleEvent = namedtuple("BattleEvent", "time attacker damage target_health")
+BattleResult = namedtuple("BattleResult", "winner events duration player_health enemy_health experience improvement")
+
+
+def experience_to_next_level(level):
+    return 50 * (level ** 2)
+
+
+def hits_to_kill(health, attack):
+    if health <= 0:
+        return 0
+    if attack <= 0:
+        return math.inf
+    return -(-health // attack)
+
+
+def resolve(player_health, player_attack, enemy_health, enemy_attack, rng=random):
+    # Битва за тією ж логікою, що Battle.update, але без очікування: гравець б'є кожні
+    # PLAYER_ATTACK_INTERVAL мс, ворог - кожні ENEMY_ATTACK_INTERVAL мс, шкода дорівнює атаці,
+    # при одночасних ударах першим б'є гравець. Час рахується від початку битви
+    player_hits = hits_to_kill(enemy_health, player_attack)
+    enemy_hits = hits_to_kill(player_health, enemy_attack)
+    player_finish = player_hits * PLAYER_ATTACK_INTERVAL
+    enemy_finish = enemy_hits * ENEMY_ATTACK_INTERVAL
+    if player_finish == math.inf and enemy_finish == math.inf:
+        return BattleResult(None, [], math.inf, player_health, enemy_health, 0, None)
+
+    winner = 'player' if player_finish <= enemy_finish else 'enemy'
+    duration = min(player_finish, enemy_finish)
+
+    events = []
+    player_time, enemy_time = PLAYER_ATTACK_INTERVAL, ENEMY_ATTACK_INTERVAL
+    while player_health > 0 and enemy_health > 0:
+        if player_time <= enemy_time:
+            enemy_health -= player_attack
+            events.append(BattleEvent(player_time, 'player', player_attack, enemy_health))
+            player_time += PLAYER_ATTACK_INTERVAL
+        else:
+            player_health -= enemy_attack
+            events.append(BattleEvent(enemy_time, 'enemy', enemy_attack, player_health))
+            enemy_time += ENEMY_ATTACK_INTERVAL
+
+    experience, improvement = 0, None
+    if winner == 'player':
+        # Той самий порядок викликів rng, що й у Battle.update, тож результат з тим самим seed збігається
+        experience = rng.randint(*EXPERIENCE_RANGE)
+        improvement = rng.choice(STAT_IMPROVEMENTS)
+    return BattleResult(winner, events, duration, player_health, enemy_health, experience, improvement)
+
+
+def player_wins(player_health, player_attack, enemy_health, enemy_attack):
+    # Векторизований результат для масивів характеристик (без подій)
+    player_health = np.asarray(player_health)
+    enemy_health = np.asarray(enemy_health)
+    player_attack = np.maximum(np.asarray(player_attack), 1e-9)
+    enemy_attack = np.maximum(np.asarray(enemy_attack), 1e-9)
+    player_finish = np.ceil(enemy_health / player_attack) * PLAYER_ATTACK_INTERVAL
+    enemy_finish = np.ceil(player_health / enemy_attack) * ENEMY_ATTACK_INTERVAL
+    return player_finish <= enemy_finish, np.minimum(player_finish, enemy_finish)
+
+
+def monte_carlo(runs, fights, player=None, enemy=None, seed=None):
+    # runs незалежних проходжень по fights битв поспіль. Здоров'я, рівень і нагороди
+    # переносяться між битвами, як у грі. Усі проходження рахуються одночасно масивами NumPy
+    player = {**dict(health=100, max_health=100, attack=10, defense=5, level=1, experience=0), **(player or {})}
+    enemy = {**dict(health=50, attack=10), **(enemy or {})}
+    rng = np.random.default_rng(seed)
+
+    health = np.full(runs, player['health'], dtype=np.int64)
+    max_health = np.full(runs, player['max_health'], dtype=np.int64)
+    attack = np.full(runs, player['attack'], dtype=np.int64)
+    defense = np.full(runs, player['defense'], dtype=np.int64)
+    level = np.full(runs, player['level'], dtype=np.int64)
+    experience = np.full(runs, player['experience'], dtype=np.int64)
+    alive = np.ones(runs, dtype=bool)
+    won = np.zeros(runs, dtype=np.int64)
+    battle_time = np.zeros(runs, dtype=np.int64)
+    simulated = 0
+
+    for _ in range(fights):
+        if not alive.any():
+            break
+        simulated += int(alive.sum())
+        wins, duration = player_wins(health, attack, enemy['health'], enemy['attack'])
+        wins &= alive
+        battle_time[alive] += duration[alive].astype(np.int64)
+        # Переможець б'є останнім: ворог встигає вдарити лише строго до моменту своєї смерті
+        enemy_hits = (duration.astype(np.int64) - 1) // ENEMY_ATTACK_INTERVAL
+        health = np.where(wins, health - enemy_hits * enemy['attack'], health)
+        alive &= wins
+        won += wins
+
+        experience += np.where(wins, rng.integers(EXPERIENCE_RANGE[0], EXPERIENCE_RANGE[1] + 1, runs), 0)
+        while True:
+            level_up = wins & (experience >= 50 * level ** 2) & (level < MAX_LEVEL)
+            if not level_up.any():
+                break
+            experience -= np.where(level_up, 50 * level ** 2, 0)
+            level += level_up
+            max_health += 10 * level_up
+            health = np.where(level_up, max_health, health)
+
+        choice = np.where(wins, rng.integers(0, len(STAT_IMPROVEMENTS), runs), -1)
+        attack += 2 * (choice == 0)
+        defense += choice == 1
+        health = np.where(choice == 2, np.minimum(health + 25, max_health), health)
+        max_health += 10 * (choice == 3)
+
+    return {
+        "runs": runs,
+        "fights": fights,
+        "fights_simulated": simulated,
+        "survival_rate": float(alive.mean()),
+        "mean_fights_won": float(won.mean()),
+        "fights_won_percentiles": {str(p): float(np.percentile(won, p)) for p in (10, 50, 90)},
+        "mean_level": float(level.mean()),
+        "max_level": int(level.max()),
+        "mean_attack": float(attack.mean()),
+        "mean_health": float(np.where(alive, health, 0).mean()),
+        "mean_battle_time_s": float(battle_time.mean() / 1000),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Аналіз балансу битв методом Монте-Карло")
+    parser.add_argument("--runs", type=int, default=100000)
+    parser.add_argument("--fights", type=int, default=20)
+    parser.add_argument("--enemy-health", type=int, default=50)
+    parser.add_argument("--enemy-attack", type=int, default=10)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    report = monte_carlo(args.runs, args.fights, enemy={"health": args.enemy_health, "attack": args.enemy_attack},
+                         seed=args.seed)
+    report["elapsed_s"] = time.perf_counter() - start
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
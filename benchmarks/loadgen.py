@@ -0,0 +1,149 @@
+# Навантаження на server.py: N ботів з випадковим рухом, звіт про затримки тіків.
+# Запуск з кореня репозиторію, коли сервер уже працює (python server.py):
+#   python -m benchmarks.loadgen [--bots 200] [--duration 30] [--port 8765] [--output loadgen.json]
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from simulation import RandomWalkInput
+from server import SERVER_CONFIG, percentile
+
+
+class LoadStats:
+    def __init__(self):
+        self.connected = 0
+        self.errors = []
+        self.states = 0
+        self.state_gaps = []
+        self.ping_ms = []
+        self.battles_skipped = 0
+
+
+def send(writer, message):
+    writer.write((json.dumps(message) + "\n").encode("utf-8"))
+
+
+async def receive(reader, writer, stats, skip_battles):
+    # Інтервал між станами, які бачить клієнт, і час від ping до pong
+    # (ввід чекає на найближчий тік сервера)
+    last_state = None
+    in_battle = False
+    while True:
+        line = await reader.readline()
+        if not line:
+            return
+        message = json.loads(line)
+        now = time.perf_counter()
+        if message["type"] == "state":
+            stats.states += 1
+            if last_state is not None:
+                stats.state_gaps.append((now - last_state) * 1000)
+            last_state = now
+            battle = message["state"] == "battle"
+            if battle and not in_battle and skip_battles:
+                send(writer, {"type": "skip"})
+                stats.battles_skipped += 1
+            in_battle = battle
+        elif message["type"] == "pong":
+            stats.ping_ms.append((now - message["t"]) * 1000)
+
+
+async def run_bot(index, args, stats):
+    await asyncio.sleep(args.ramp * index / max(args.bots, 1))
+    try:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    except OSError as e:
+        stats.errors.append(str(e))
+        return
+    send(writer, {"type": "hello", "player_id": args.first_id + index, "name": f"bot{index}"})
+    welcome = json.loads(await reader.readline() or b"{}")
+    if welcome.get("type") != "welcome":
+        stats.errors.append(welcome.get("error", "немає відповіді"))
+        writer.close()
+        return
+    stats.connected += 1
+    receiver = asyncio.create_task(receive(reader, writer, stats, args.skip_battles))
+    walker = RandomWalkInput(args.seed + index)
+    interval = welcome["tick_ms"] / 1000
+    end = time.perf_counter() + args.duration
+    ticks = 0
+    while time.perf_counter() < end and not receiver.done():
+        dx, dy = walker.next_movement()
+        send(writer, {"type": "input", "dx": dx, "dy": dy})
+        if ticks % args.ping_every == 0:
+            send(writer, {"type": "ping", "t": time.perf_counter()})
+        ticks += 1
+        await asyncio.sleep(interval)
+    send(writer, {"type": "bye"})
+    receiver.cancel()
+    writer.close()
+
+
+async def server_stats(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    send(writer, {"type": "stats"})
+    message = json.loads(await reader.readline())
+    writer.close()
+    return message
+
+
+async def run(args):
+    # Показники сервера знімаються наприкінці, поки боти ще під'єднані
+    stats = LoadStats()
+    bots = asyncio.gather(*(run_bot(i, args, stats) for i in range(args.bots)))
+    await asyncio.sleep(args.ramp + args.duration * 0.95)
+    server = await server_stats(args)
+    await bots
+    return stats, server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default=SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG["port"])
+    parser.add_argument("--bots", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30, help="секунд руху кожного бота")
+    parser.add_argument("--ramp", type=float, default=2, help="за скільки секунд під'єднуються всі боти")
+    parser.add_argument("--first-id", type=int, default=1000, help="player_id першого бота")
+    parser.add_argument("--ping-every", type=int, default=20, help="ping кожен N-й тік")
+    parser.add_argument("--no-skip", dest="skip_battles", action="store_false", help="не пропускати битви")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="файл для результатів JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stats, server = asyncio.run(run(args))
+    results = {
+        "bots": args.bots,
+        "connected": stats.connected,
+        "errors": len(stats.errors),
+        "states_per_bot_per_s": stats.states / max(stats.connected, 1) / args.duration,
+        "state_gap_p50_ms": percentile(stats.state_gaps, 0.50),
+        "state_gap_p99_ms": percentile(stats.state_gaps, 0.99),
+        "ping_p50_ms": percentile(stats.ping_ms, 0.50),
+        "ping_p99_ms": percentile(stats.ping_ms, 0.99),
+        "battles_skipped": stats.battles_skipped,
+        "server": server,
+    }
+    print(f"Боти: {stats.connected}/{args.bots}, помилок: {len(stats.errors)}")
+    if stats.errors:
+        print(f"  перша помилка: {stats.errors[0]}")
+    print(f"Станів на бота за секунду: {results['states_per_bot_per_s']:.1f}")
+    print(f"Інтервал між станами:   p50 {results['state_gap_p50_ms']:.1f} ms  p99 {results['state_gap_p99_ms']:.1f} ms")
+    print(f"Ввід до тіку (ping):    p50 {results['ping_p50_ms']:.1f} ms  p99 {results['ping_p99_ms']:.1f} ms")
+    print(f"Тік сервера ({server['sessions']} сесій): p50 {server['tick_p50_ms']:.2f} ms  "
+          f"p99 {server['tick_p99_ms']:.2f} ms  max {server['tick_max_ms']:.2f} ms  "
+          f"перевищень: {server['overruns']}")
+    print(f"Помилок сервера: сховища {server['db_errors']}, сесій {server['session_errors']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+# Пам'ять на кімнату та ворога (tracemalloc), як їх тримає кеш гри.
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.memory [--rooms 2000] [--enemies 20000] [--output memory.json]
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from models import Room, Enemy, EnemyGroup, RoomCache
+from storage import START_ROOM
+
+
+def measure(build):
+    # Приріст виділеної пам'яті, поки результат build() живий
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return after - before
+
+
+def room_data(room_id):
+    return dict(START_ROOM, id=room_id, up_room_id=room_id + 1, left_room_id=-1)
+
+
+def bench_rooms(count):
+    return measure(lambda: [Room.from_dict(room_data(i)) for i in range(1, count + 1)]) / count
+
+
+def bench_cached_rooms(count):
+    # Кімната разом із записом у RoomCache та порожньою групою ворогів
+    def build():
+        cache = RoomCache(maxsize=count)
+        for i in range(1, count + 1):
+            room = Room.from_dict(room_data(i))
+            cache.put_room(room)
+            cache.put_enemies(i, EnemyGroup(i))
+        return cache
+
+    return measure(build) / count
+
+
+def bench_enemies(count):
+    return measure(lambda: [Enemy(i, 100, 100, 50, 10, 5, 1) for i in range(count)]) / count
+
+
+def bench_enemy_group(count):
+    rows = [(i, 100, 100, 50, 10, 5, 1) for i in range(count)]
+    return measure(lambda: EnemyGroup(1, rows)) / count
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--enemies", type=int, default=20000)
+    parser.add_argument("--output", help="файл для результатів JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = {
+        "bytes_per_room": bench_rooms(args.rooms),
+        "bytes_per_cached_room": bench_cached_rooms(args.rooms),
+        "bytes_per_enemy_object": bench_enemies(args.enemies),
+        "bytes_per_enemy_in_group": bench_enemy_group(args.enemies),
+    }
+    for name, value in results.items():
+        print(f"{name:26} {value:10.1f} байт")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
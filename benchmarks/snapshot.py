@@ -0,0 +1,105 @@
+# Знімок світу проти завантаження кімнат запитами до сховища.
+# Запуск з кореня репозиторію (сховище - з RPG_STORAGE, типово postgres):
+#   python -m benchmarks.snapshot [--rooms 20000] [--reads 2000] [--path bench.snap]
+# Бенчмарк замінює світ у сховищі згенерованим, тому для postgres і sqlite потрібна окрема БД:
+#   RPG_STORAGE=sqlite python -m benchmarks.snapshot --database bench.db
+import argparse
+import os
+import random
+import sys
+import time
+
+from storage import get_backend, DIRECTIONS, STORAGE_CONFIG, SnapshotBackend
+from benchmarks.suite import use_benchmark_database
+from snapshot import export_snapshot, import_snapshot, SnapshotReader
+
+
+def generate_world(rooms, enemies_per_room, seed=1):
+    # Ланцюг кімнат із зворотними зв'язками та кількома ворогами в кожній
+    rng = random.Random(seed)
+    world_rooms, enemies = [], []
+    for room_id in range(1, rooms + 1):
+        room = {"id": room_id, "x": 0, "y": 0, "width": 800, "height": 600, "visited": rng.random() < 0.5}
+        for direction in DIRECTIONS:
+            room[f"{direction}_room_id"] = rng.choice((None, -1))
+        room["right_room_id"] = room_id + 1 if room_id < rooms else -1
+        room["left_room_id"] = room_id - 1 if room_id > 1 else None
+        world_rooms.append(room)
+        for _ in range(enemies_per_room):
+            enemies.append((len(enemies) + 1, rng.randrange(760), rng.randrange(560), 50, 10, 5, room_id))
+    players = [{"id": 1, "x": 100, "y": 100, "current_room_id": 1, "health": 100, "max_health": 100,
+                "attack": 10, "defense": 5, "experience": 0, "level": 1, "name": "Bench"}]
+    return world_rooms, players, enemies
+
+
+def timed(action):
+    start = time.perf_counter()
+    result = action()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rooms", type=int, default=20000)
+    parser.add_argument("--enemies-per-room", type=int, default=3)
+    parser.add_argument("--reads", type=int, default=2000, help="кількість випадкових читань кімнат")
+    parser.add_argument("--path", default="bench.snap")
+    parser.add_argument("--database", default=None,
+                        help="окрема БД бенчмарку: назва БД PostgreSQL або шлях до файлу SQLite")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    use_benchmark_database(STORAGE_CONFIG["backend"], args.database)
+    backend = get_backend()
+    backend.initialize()
+    backend.import_world(*generate_world(args.rooms, args.enemies_per_room))
+    room_ids = random.Random(2).choices(range(1, args.rooms + 1), k=args.reads)
+
+    counts, export_ms = timed(lambda: export_snapshot(args.path, backend))
+    _, import_ms = timed(lambda: import_snapshot(args.path, backend))
+
+    def read_backend():
+        for room_id in room_ids:
+            backend.load_room(room_id)
+            backend.load_enemies([room_id])
+
+    def read_snapshot():
+        with SnapshotReader(args.path) as reader:
+            for room_id in room_ids:
+                reader.room(room_id)
+                reader.enemies(room_id)
+
+    _, backend_ms = timed(read_backend)
+    _, snapshot_ms = timed(read_snapshot)
+    _, open_ms = timed(lambda: SnapshotReader(args.path).close())
+
+    def start_from_snapshot():
+        # Як python game.py --snapshot: сховище поверх файлу і перша кімната гравця
+        store = SnapshotBackend(args.path)
+        store.load_room(1)
+        store.load_enemies([1])
+        store.close()
+
+    _, start_ms = timed(start_from_snapshot)
+
+    print(f"Світ: {counts['rooms']} кімнат, {counts['enemies']} ворогів, "
+          f"знімок {os.path.getsize(args.path) / 1024:.0f} КБ ({backend.name})")
+    results = (
+        ("експорт", export_ms),
+        ("імпорт", import_ms),
+        ("відкриття знімка", open_ms),
+        ("старт зі знімка", start_ms),
+        ("кімната + вороги, сховище", backend_ms / args.reads),
+        ("кімната + вороги, знімок", snapshot_ms / args.reads),
+    )
+    for name, value in results:
+        print(f"{name:26} {value:10.4f} ms")
+    os.remove(args.path)
+    backend.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+# Набір бенчмарків, що проганяє справжній код Game без вікна.
+# Запуск з кореня репозиторію:
+#   python -m benchmarks.suite                          - виміряти та вивести результати
+#   python -m benchmarks.suite --output results.json    - зберегти результати в JSON
+#   python -m benchmarks.suite --update-baseline        - записати benchmarks/baseline.json
+#   python -m benchmarks.suite --baseline benchmarks/baseline.json --tolerance 0.5
+#   python -m benchmarks.suite --storage sqlite --database bench.db  - сховище очищається, тому
+#                                                                       лише окрема БД, не БД гри
+# Якщо p50 або p99 будь-якого сценарію гірші за базові більше ніж на tolerance (і більше ніж на --floor-ms)
+# або запитів/оп більше ніж на --statement-tolerance (і більше ніж на --statement-floor) - код виходу 1.
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+
+import pygame
+
+import models
+import storage
+from persistence import persistence
+from battle import Battle
+from game import Game
+from models import Enemy, Room
+from simulation import RandomWalkInput
+from spawn import sample_positions
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+def summarize(timings, statements, elapsed):
+    timings = sorted(timings)
+    return {
+        "operations": len(timings),
+        "throughput_per_s": len(timings) / elapsed if elapsed > 0 else 0.0,
+        "mean_ms": sum(timings) / len(timings) if timings else 0.0,
+        "p50_ms": percentile(timings, 0.50),
+        "p90_ms": percentile(timings, 0.90),
+        "p99_ms": percentile(timings, 0.99),
+        "max_ms": timings[-1] if timings else 0.0,
+        "statements": statements,
+        "statements_per_op": statements / len(timings) if timings else 0.0,
+    }
+
+
+def use_benchmark_database(storage_name, database):
+    # Сценарії очищають сховище, тож postgres і sqlite потребують окремої БД бенчмарку:
+    # збережену гру (DATABASE_CONFIG, STORAGE_CONFIG["sqlite_path"]) не очищаємо ніколи
+    if storage_name == "memory":
+        return
+    if not database:
+        raise SystemExit(f"Для --storage {storage_name} потрібна окрема БД бенчмарку: --database "
+                         f"{'<шлях до файлу>' if storage_name == 'sqlite' else '<назва БД>'}")
+    if storage_name == "sqlite":
+        if os.path.abspath(database) == os.path.abspath(storage.STORAGE_CONFIG["sqlite_path"]):
+            raise SystemExit(f"Відмова: {database} - файл гри, бенчмарк його очистив би")
+        storage.STORAGE_CONFIG["sqlite_path"] = database
+    else:
+        import database as db
+
+        if database == db.DATABASE_CONFIG["dbname"]:
+            raise SystemExit(f"Відмова: {database} - БД гри, бенчмарк її очистив би")
+        db.DATABASE_CONFIG["dbname"] = database
+
+
+def new_game(storage_name, seed, render=False):
+    # Кожен сценарій починає з чистого світу; черга запису попереднього дописується в його сховище
+    persistence.drain()
+    if storage_name == "memory":
+        storage.set_backend(storage.MemoryBackend())
+    else:
+        backend = storage.get_backend()
+        # Таблиці мають існувати до очищення (нова БД бенчмарку)
+        backend.initialize()
+        backend.clear()
+    models.room_cache.clear()
+    return Game(headless=True, render=render, seed=seed,
+                input_source=RandomWalkInput(seed), timestep=16)
+
+
+def measure(game, operation, count, between=None):
+    # Запис, поставлений у чергу під час підготовки (збереження гравця в Game.__init__, вороги сценарію),
+    # до вимірювання не належить
+    persistence.drain()
+    backend = storage.get_backend()
+    statements_before = backend.statements
+    timings = []
+    # Як у timeit: збирач сміття під час вимірювання вимкнено, інакше його паузи потрапляють у p99
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for i in range(count):
+            op_start = time.perf_counter()
+            operation(i)
+            timings.append((time.perf_counter() - op_start) * 1000)
+            if between is not None:
+                between()
+        elapsed = time.perf_counter() - start
+    finally:
+        gc.enable()
+    # Запити фонового запису теж належать сценарію
+    persistence.drain()
+    return summarize(timings, backend.statements - statements_before, elapsed)
+
+
+def bench_exploration(args):
+    game = new_game(args.storage, args.seed)
+
+    def step(_):
+        # Гравець не вступає в битви, щоб вимірювати саме рух і колізії
+        if game.current_battle:
+            game.current_battle.finish()
+        game.game_state = 'exploration'
+        game.current_battle = None
+        game.handle_collisions()
+        game.update_room()
+        dx, dy = game.get_movement()
+        game.move_player(dx, dy)
+        game.player_store.maybe_flush()
+        game.advance_time()
+
+    return measure(game, step, args.steps)
+
+
+def bench_room_transitions(args):
+    game = new_game(args.storage, args.seed)
+    # Праворуч у нову кімнату, назад ліворуч у відвідану, знову праворуч у відвідану
+    directions = ('right', 'left', 'right')
+
+    def transition(i):
+        game.move_to_room(directions[i % 3])
+
+    return measure(game, transition, args.transitions)
+
+
+def bench_room_transitions_pregen(args):
+    # Те саме, але нові кімнати будуються у фоні між переходами (час очікування фону не враховується)
+    game = new_game(args.storage, args.seed)
+    game.pregen.background = True
+    game.pregen.schedule(game.current_room)
+    game.pregen.wait_idle()
+    directions = ('right', 'left', 'right')
+
+    def transition(i):
+        game.move_to_room(directions[i % 3])
+
+    return measure(game, transition, args.transitions, between=game.pregen.wait_idle)
+
+
+def legacy_room_create(prev_room, direction, rng):
+    # Попередня реалізація Room.create для порівняння: INSERT без зв'язків, UPDATE попередньої кімнати,
+    # UPDATE зв'язків нової і ще один UPDATE з new_room.save() - кожне окремим зверненням до сховища
+    new_room = Room(None, 0, 0, 800, 600, None, None, None, None)
+    new_room.id = persistence.call("insert_room", new_room.to_dict(), after=())
+    opposite = {'left': 'right', 'right': 'left', 'up': 'down', 'down': 'up'}[direction]
+    setattr(new_room, f"{opposite}_room_id", prev_room.id)
+    setattr(prev_room, f"{direction}_room_id", new_room.id)
+    persistence.call("save_room", prev_room.to_dict(), after=())
+    directions = [d for d in ('up', 'down', 'left', 'right') if d != opposite]
+    for d in rng.sample(directions, k=rng.randint(1, 3)):
+        setattr(new_room, f"{d}_room_id", -1)
+    persistence.call("save_room", new_room.to_dict(), after=())
+    new_room.right_room_id = -1
+    persistence.call("save_room", new_room.to_dict(), after=())
+    return new_room
+
+
+def bench_room_create(args, legacy=False):
+    # Ланцюжок нових кімнат праворуч, як їх будує RoomPregenerator: Room.create (запис кімнати
+    # разом зі зворотним зв'язком) і збереження попередньої кімнати з новим виходом
+    game = new_game(args.storage, args.seed)
+    rng = random.Random(args.seed)
+    chain = [game.current_room]
+
+    def create(_):
+        prev_room = chain[-1]
+        if legacy:
+            new_room = legacy_room_create(prev_room, 'right', rng)
+        else:
+            new_room = Room.create(prev_room=prev_room, from_direction='right', rng=rng)
+            prev_room.right_room_id = new_room.id
+            prev_room.save()
+        chain.append(new_room)
+
+    return measure(game, create, args.rooms)
+
+
+def bench_room_create_legacy(args):
+    return bench_room_create(args, legacy=True)
+
+
+def bench_battles(args):
+    game = new_game(args.storage, args.seed)
+    game.player.max_health = game.player.health = 10 ** 9
+    room_id = game.current_room.id
+
+    def spawn(count):
+        enemies = Enemy.create_many([(400, 300, 50, 1, 5, room_id)] * count)
+        return [Battle(game, enemy) for enemy in enemies]
+
+    battles = spawn(args.battles)
+
+    def tick(_):
+        game.advance_time()
+        # Удари всіх битв - таймери планувальника; кадр без ударів нічого не перебирає
+        game.scheduler.run_due()
+        finished = sum(1 for battle in battles if battle.finished)
+        # Завершені битви замінюються новими, щоб кількість одночасних битв не змінювалась
+        if finished:
+            battles[:] = [battle for battle in battles if not battle.finished] + spawn(finished)
+        game.game_state = 'exploration'
+        game.messages.clear()
+
+    return measure(game, tick, args.ticks)
+
+
+def bench_draw_room(args):
+    game = new_game(args.storage, args.seed, render=True)
+
+    def draw(_):
+        game.renderer.draw_room()
+        game.renderer.present()
+        game.advance_time()
+
+    # Рахуємо нові поверхні, які створює pygame.transform.scale під час малювання
+    scale = pygame.transform.scale
+    allocations = [0]
+
+    def counting_scale(*scale_args, **scale_kwargs):
+        allocations[0] += 1
+        return scale(*scale_args, **scale_kwargs)
+
+    pygame.transform.scale = counting_scale
+    try:
+        result = measure(game, draw, args.frames)
+    finally:
+        pygame.transform.scale = scale
+    result["surface_allocations_per_op"] = allocations[0] / args.frames
+    return result
+
+
+def bench_dense_room(args):
+    # Кімната з сотнями ворогів: колізії гравця та малювання за кадр
+    game = new_game(args.storage, args.seed, render=True)
+    room = game.current_room
+    positions = sample_positions(room, args.enemies)
+    Enemy.create_many([(x, y, 50, 10, 5, room.id) for x, y in positions])
+    game.set_enemies(Enemy.load_all(room.id))
+
+    def frame(_):
+        game.handle_collisions()
+        # Битву не починаємо, щоб вороги малювалися в кожному кадрі
+        if game.current_battle:
+            game.current_battle.finish()
+        game.game_state = 'exploration'
+        game.current_battle = None
+        game.renderer.draw_room()
+        game.renderer.present()
+        game.advance_time()
+
+    return measure(game, frame, args.frames)
+
+
+SCENARIOS = {
+    "exploration": bench_exploration,
+    "room_transitions": bench_room_transitions,
+    "room_transitions_pregen": bench_room_transitions_pregen,
+    "room_create": bench_room_create,
+    "room_create_legacy": bench_room_create_legacy,
+    "battles": bench_battles,
+    "draw_room": bench_draw_room,
+    "dense_room": bench_dense_room,
+}
+
+
+def compare(results, baseline, tolerance, statement_tolerance=0.1, floor_ms=0.5, statement_floor=0.05):
+    # Пороги: час - відносний tolerance, але не менше floor_ms (субмілісекундні p50/p99 коливаються сильніше);
+    # запити - statement_tolerance, але не менше statement_floor: фоновий запис зливає команди залежно
+    # від того, коли встигає потік, і з базою 0.00 один зайвий запис не має бути регресією
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            limit = max(base[metric] * (1 + tolerance), base[metric] + floor_ms)
+            if base[metric] > 0 and result[metric] > limit:
+                regressions.append(f"{name}.{metric}: {result[metric]:.4f} ms > {base[metric]:.4f} ms (база)")
+        statement_limit = max(base["statements_per_op"] * (1 + statement_tolerance),
+                              base["statements_per_op"] + statement_floor)
+        if result["statements_per_op"] > statement_limit:
+            regressions.append(f"{name}.statements_per_op: {result['statements_per_op']:.2f} > "
+                               f"{base['statements_per_op']:.2f} (база)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--storage", default="memory", choices=sorted(storage.BACKENDS))
+    parser.add_argument("--database", default=None,
+                        help="окрема БД бенчмарку: назва БД PostgreSQL або шлях до файлу SQLite")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--steps", type=int, default=5000, help="кроки дослідження")
+    parser.add_argument("--transitions", type=int, default=200, help="переходи між кімнатами")
+    parser.add_argument("--rooms", type=int, default=500, help="нові кімнати в room_create")
+    parser.add_argument("--battles", type=int, default=50, help="кількість одночасних битв")
+    parser.add_argument("--ticks", type=int, default=2000, help="кадри битв")
+    parser.add_argument("--frames", type=int, default=1000, help="кадри draw_room")
+    parser.add_argument("--enemies", type=int, default=300, help="вороги в dense_room")
+    parser.add_argument("--output", help="файл для результатів JSON")
+    parser.add_argument("--baseline", help="файл з базовими результатами для порівняння")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--statement-tolerance", type=float, default=0.1,
+                        help="допустиме відносне зростання запитів/оп")
+    parser.add_argument("--floor-ms", type=float, default=0.5,
+                        help="мінімальне абсолютне зростання p50/p99, що вважається регресією")
+    parser.add_argument("--statement-floor", type=float, default=0.05,
+                        help="мінімальне абсолютне зростання запитів/оп, що вважається регресією")
+    parser.add_argument("--update-baseline", action="store_true")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    use_benchmark_database(args.storage, args.database)
+    storage.STORAGE_CONFIG["backend"] = args.storage
+
+    results = {}
+    for name in args.scenarios:
+        results[name] = SCENARIOS[name](args)
+        result = results[name]
+        print(f"{name:24} {result['throughput_per_s']:10.0f} оп/с  p50 {result['p50_ms']:.4f} ms  "
+              f"p99 {result['p99_ms']:.4f} ms  max {result['max_ms']:.4f} ms  "
+              f"запитів/оп {result['statements_per_op']:.2f}")
+
+    report = {"storage": args.storage, "seed": args.seed, "scenarios": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Базові результати збережено у {BASELINE_PATH}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.statement_tolerance, args.floor_ms,
+                              args.statement_floor)
+        if regressions:
+            print("РЕГРЕСІЯ ПРОДУКТИВНОСТІ:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("Регресій не виявлено.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
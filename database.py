@@ -1,5 +1,10 @@
+import atexit
+import threading
+import time
 import psycopg2
+from psycopg2 import extensions, pool
 from contextlib import contextmanager
+from migrations import migrate
 
 #Не став ховати данні в .env оскільки це зайве в локальній мережі
 DATABASE_CONFIG = {
@@ -10,13 +15,99 @@ DATABASE_CONFIG = {
     "port": "5432"
 }
 
+# Розмір пулу з'єднань: minconn відкриваються одразу і лишаються відкритими, maxconn - верхня межа.
+# Пул закриває повернені з'єднання понад minconn (разом з їхніми prepared statements), тому minconn -
+# кількість потоків, що працюють з БД одночасно: гра, запис у фоні (persistence) і генерація кімнат (pregen).
+# health_check_interval - через скільки секунд простою з'єднання перевіряється запитом SELECT 1
+POOL_CONFIG = {
+    "minconn": 3,
+    "maxconn": 5,
+    "health_check_interval": 30
+}
+
+_pool = None
+_pool_lock = threading.Lock()
+_last_used = {}
+# Імена серверних prepared statements, уже підготовлених на кожному з'єднанні (id(conn) -> set)
+_prepared = {}
+
+
+def get_db_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pool.ThreadedConnectionPool(
+                    POOL_CONFIG["minconn"], POOL_CONFIG["maxconn"], **DATABASE_CONFIG
+                )
+    return _pool
+
+
+def configure_pool(concurrency):
+    # Для процесів з більшою кількістю потоків БД (сервер); діє на пул, створений після виклику
+    POOL_CONFIG["minconn"] = concurrency
+    POOL_CONFIG["maxconn"] = max(POOL_CONFIG["maxconn"], concurrency)
+
+
+def close_db_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
+            _last_used.clear()
+            _prepared.clear()
+
+
+atexit.register(close_db_pool)
+
+
+def _is_healthy(conn):
+    if conn.closed or conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+        return False
+    idle = time.monotonic() - _last_used.get(id(conn), 0)
+    if idle < POOL_CONFIG["health_check_interval"]:
+        return True
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except psycopg2.Error:
+        return False
+
+
+def _checkout(db_pool):
+    # Перевірка при видачі: мертві з'єднання закриваються і замінюються новими
+    for _ in range(POOL_CONFIG["maxconn"] + 1):
+        conn = db_pool.getconn()
+        if _is_healthy(conn):
+            return conn
+        _last_used.pop(id(conn), None)
+        _prepared.pop(id(conn), None)
+        db_pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("Не вдалося отримати робоче з'єднання з пулу")
+
+
 @contextmanager
 def get_db_connection():
-    conn = psycopg2.connect(**DATABASE_CONFIG)
+    db_pool = get_db_pool()
+    conn = _checkout(db_pool)
+    broken = False
     try:
-        yield conn 
+        yield conn
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
     finally:
-        conn.close() 
+        broken = broken or conn.closed != 0
+        if not broken:
+            _last_used[id(conn)] = time.monotonic()
+        db_pool.putconn(conn, close=broken)
+        # Пул закриває зламані з'єднання і з'єднання понад minconn; id закритого може дістатись новому
+        if conn.closed:
+            _last_used.pop(id(conn), None)
+            _prepared.pop(id(conn), None)
 
 @contextmanager
 def get_db_cursor():
@@ -31,70 +122,33 @@ def get_db_cursor():
         finally:
             cursor.close() 
 
-def initialize_database():
-    with get_db_cursor() as cursor:
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS rooms (
-            id SERIAL PRIMARY KEY,
-            x INTEGER NOT NULL,
-            y INTEGER NOT NULL,
-            width INTEGER NOT NULL,
-            height INTEGER NOT NULL,
-            up_room_id INTEGER,
-            down_room_id INTEGER,
-            left_room_id INTEGER,
-            right_room_id INTEGER,
-            visited BOOLEAN DEFAULT FALSE
-            )
-        """)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS player (
-                id SERIAL PRIMARY KEY,
-                x INTEGER NOT NULL,
-                y INTEGER NOT NULL,
-                health INTEGER DEFAULT 100,
-                max_health INTEGER DEFAULT 100,
-                attack INTEGER DEFAULT 10,
-                defense INTEGER DEFAULT 5,
-                experience INTEGER DEFAULT 0,
-                level INTEGER DEFAULT 1,
-                current_room_id INTEGER DEFAULT 1,
-                name VARCHAR(50) DEFAULT ''
-            )
-        """)
+def prepare(cursor, name, param_types, query):
+    # PREPARE виконується один раз на з'єднання. PREPARE не належить до транзакції, тож відкат її не скасовує
+    prepared = _prepared.setdefault(id(cursor.connection), set())
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} ({', '.join(param_types)}) AS {query}")
+        prepared.add(name)
 
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS enemies (
-                id SERIAL PRIMARY KEY,
-                x INTEGER NOT NULL,
-                y INTEGER NOT NULL,
-                health INTEGER DEFAULT 50,
-                attack INTEGER DEFAULT 8,
-                defense INTEGER DEFAULT 5,
-                current_room_id INTEGER NOT NULL
-            )
-        """)
 
+def execute_prepared(cursor, name, param_types, query, params):
+    # Після першого PREPARE запит лише EXECUTE без повторного розбору і планування
+    prepare(cursor, name, param_types, query)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+
+
+def initialize_database():
+    # Міграції виконуються лише для нової або старішої схеми; при звичайному запуску -
+    # перевірка версії та стартова кімната, якщо світ порожній. Дані не видаляються
+    with get_db_cursor() as cursor:
+        migrate(cursor, "postgres")
         cursor.execute("""
             INSERT INTO rooms 
             (x, y, width, height, right_room_id)
-            VALUES (0, 0, 800, 600, -1)
-            RETURNING id
+            SELECT 0, 0, 800, 600, -1
+            WHERE NOT EXISTS (SELECT 1 FROM rooms)
         """)
 
 
-
-
-
-#initialize_database()
-
-
 def clear_database():
     with get_db_cursor() as cursor:
         cursor.execute("TRUNCATE TABLE rooms, player, enemies RESTART IDENTITY CASCADE")
-
-
-
-clear_database()
-
-
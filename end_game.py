@@ -1,4 +1,5 @@
 import pygame
+from persistence import persistence
 
 class EndGameHandler:
     def __init__(self, game):
@@ -8,9 +9,15 @@ class EndGameHandler:
         self.WIDTH = game.WIDTH
         self.HEIGHT = game.HEIGHT
         self.clock = game.clock
+        self.restart_timer = None
 
     def end_game(self):
         self.game.add_message("Вітаємо! Ви досягли 100-го рівня та завершили гру!")
+        self.game.player_store.flush(force=True)
+        persistence.drain()
+        if self.game.headless:
+            self.game.running = False
+            return
         running = True
         while running:
             #self.screen.fill((0, 0, 0))
@@ -25,19 +32,16 @@ class EndGameHandler:
         exit()
 
     def game_over(self):
+        # Перезапуск через 3 с планується один раз; до того гра далі малює кадри й обробляє події
+        if self.restart_timer is not None:
+            return
         self.game.add_message("Гра закінчена! Ви зазнали поразки.")
         self.game.add_message("Ваші характеристики скинуто до початкових значень.")
-        self.wait(3000) 
+        # Результат битви записується до відліку перезапуску
+        persistence.drain()
+        self.restart_timer = self.game.scheduler.call_later(3000, self.restart)
+
+    def restart(self):
+        self.restart_timer = None
         self.game.restart_game()
         self.game.game_state = 'exploration'
-
-    def wait(self, duration):
-        wait_start = pygame.time.get_ticks()
-        while pygame.time.get_ticks() - wait_start < duration:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-            self.game.renderer.draw_room()
-            pygame.display.flip()
-            self.clock.tick(60)
@@ -1,65 +1,116 @@
+import argparse
+import os
+import time
 import pygame
 import random
-from database import initialize_database, get_db_cursor
-from models import Room, Player, Enemy
+from storage import get_backend, STORAGE_CONFIG, BACKENDS
+from persistence import persistence
+from models import Room, Player, Enemy, EnemyGroup, PlayerWriteBehind, room_cache
 from battle import Battle
+from battle_engine import experience_to_next_level, STAT_IMPROVEMENTS
 from end_game import EndGameHandler
-from world import Renderer, PlayerSprite
+from world import Renderer
+from assets import assets
+from spawn import sample_positions, spawn_enemies, MIN_ENEMY_SPACING, PLAYER_SAFE_DISTANCE
+from pregen import RoomPregenerator
+from simulation import RealClock, SimulatedClock, RandomWalkInput
+from scheduler import Scheduler
+from profiler import FrameProfiler, StartupProfiler
+from snapshot import export_snapshot, import_snapshot, SnapshotError
 
 
-def experience_to_next_level(level):
-    return 50 * (level ** 2)
-
 class Game:
-    def __init__(self):
-        pygame.init()
-        self.WIDTH, self.HEIGHT = 800, 600
-        self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
+    # headless - без вікна (драйвер SDL dummy); render=False - без малювання взагалі;
+    # timestep - фіксований крок змодельованого часу в мс, гра працює без обмеження FPS;
+    # input_source - об'єкт з методом next_movement() замість клавіатури
+    battle_class = Battle
+
+    def __init__(self, headless=False, render=True, seed=None, input_source=None, timestep=None):
+        self.headless = headless
+        self.render_enabled = render
+        self.input_source = input_source
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+        if seed is not None:
+            random.seed(seed)
+
+        self.startup = StartupProfiler()
+        with self.startup.phase("pygame"):
+            pygame.init()
+        # Підключення до БД і перевірка схеми - у фоновому потоці, поки відкривається вікно;
+        # зображення читаються з диска ще одним фоновим потоком
+        database_ready = self.startup.background("database", lambda: get_backend().initialize())
+        with self.startup.phase("assets"):
+            assets.preload()
+        with self.startup.phase("display"):
+            self.WIDTH, self.HEIGHT = 800, 600
+            self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT))
+            # Шрифт за замовчуванням без SysFont: пошук системних шрифтів (fc-list) повільний
+            self.font = pygame.font.Font(None, 36)
+            self.stats_font = pygame.font.Font(None, 24)
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 36)
+        if timestep is None:
+            self.time = RealClock(self.clock)
+        else:
+            self.time = SimulatedClock(timestep)
+        # Усі відкладені події гри (удари в битві, зникнення повідомлень, кадри анімації)
+        self.scheduler = Scheduler(self.time)
+        self.running = False
+        self.profiler = FrameProfiler()
+        self.show_profiler = False
+        self.profile_output = None
+        self.snapshot_path = STORAGE_CONFIG["snapshot_path"]
         self.input_active = True
         self.player_name = ""
-        self.stats_font = pygame.font.SysFont(None, 24)
         self.messages = []  
         self.message_duration = 3000  
         self.last_message_time = 0 
+        self.message_timer = None
         self.game_state = 'exploration'
         self.current_battle = None
-        self.player_sprite = PlayerSprite("images/player.gif") 
-                
-        initialize_database()
-        self.player = Player.load()
-        self.current_room = Room.load(self.player.current_room_id)
-        
-        if self.player.name:
-            self.input_active = False
-            self.player_name = self.player.name
-        else:
-            self.input_active = True
-            self.player_name = ""
-
- 
-        if not self.current_room:
-            self.add_message(f"Помилка: кімната {self.player.current_room_id} не знайдена! Створюється базова.")
-            self.current_room = Room(
-                id=1,
-                x=0,
-                y=0,
-                width=self.WIDTH,
-                height=self.HEIGHT,
-                up_room_id=None,
-                down_room_id=None,
-                left_room_id=None,
-                right_room_id=2 
-            )
-        self.enemies = Enemy.load_all(self.player.current_room_id)
-
-        self.player_img = pygame.Surface((40, 40))
-        self.enemy_img = pygame.Surface((40, 40))
-        self.room_img = pygame.Surface((40, 40))
-
-        self.renderer = Renderer(self)
-        self.end_game_handler = EndGameHandler(self)
+
+        database_ready.wait()
+        with self.startup.phase("world"):
+            self.player = Player.load()
+            self.player_store = PlayerWriteBehind(self.player, clock=self.time)
+            self.player.sprite.attach(self.scheduler)
+            self.current_room = Room.load(self.player.current_room_id)
+
+            if headless and not self.player.name:
+                # Без вікна ім'я не ввести; заглушка лише для цього запуску і в БД не пишеться
+                self.input_active = False
+                self.player_name = "Headless"
+            elif self.player.name:
+                self.input_active = False
+                self.player_name = self.player.name
+            else:
+                self.input_active = True
+                self.player_name = ""
+
+            if not self.current_room:
+                self.add_message(f"Помилка: кімната {self.player.current_room_id} не знайдена! Створюється базова.")
+                self.current_room = Room(
+                    id=1,
+                    x=0,
+                    y=0,
+                    width=self.WIDTH,
+                    height=self.HEIGHT,
+                    up_room_id=None,
+                    down_room_id=None,
+                    left_room_id=None,
+                    right_room_id=2 
+                )
+            self.set_enemies(Enemy.load_all(self.player.current_room_id))
+            Room.prefetch_neighbours(self.current_room)
+            # З seed кімнати не генеруються наперед у фоні, щоб запуск був відтворюваним
+            self.pregen = RoomPregenerator(background=seed is None, seed=random.getrandbits(64))
+            self.pregen.schedule(self.current_room)
+
+        with self.startup.phase("renderer"):
+            self.renderer = Renderer(self)
+            self.end_game_handler = EndGameHandler(self)
+        self.startup.finish()
         
         self.transitioning = False
         self.transition_direction = None
@@ -82,19 +133,33 @@ class Game:
                 self.transition_direction = direction
                 return
 
-        for enemy in self.enemies:
-            enemy_rect = pygame.Rect(enemy.x, enemy.y, 40, 40)
-            if player_rect.colliderect(enemy_rect):
-                self.game_state = 'battle'
-                self.current_battle = Battle(self, enemy)
-                self.add_message(f"Битва з ворогом (HP: {enemy.health})!")
-                break
+        enemy = self.enemies.first_overlap(player_rect)
+        if enemy is not None:
+            self.game_state = 'battle'
+            self.current_battle = self.battle_class(self, enemy)
+            self.add_message(f"Битва з ворогом (HP: {enemy.health})!")
 
-            
-    def add_message(self, text):
-        self.messages.append((text, pygame.time.get_ticks()))
+    def set_enemies(self, enemies):
+        self.enemies = enemies
 
-    def restart_game(self):
+    def remove_enemy(self, enemy):
+        self.enemies.remove(enemy.id)
+
+    def add_message(self, text):
+        self.messages.append((text, self.time.now()))
+        if self.message_timer is None:
+            self.message_timer = self.scheduler.call_later(self.message_duration, self.expire_messages)
+
+    def expire_messages(self):
+        # Повідомлення живуть однаково довго, тож достатньо одного таймера на найстаріше
+        current_time = self.time.now()
+        while self.messages and current_time - self.messages[0][1] >= self.message_duration:
+            self.messages.pop(0)
+        self.message_timer = None
+        if self.messages:
+            self.message_timer = self.scheduler.call_at(self.messages[0][1] + self.message_duration, self.expire_messages)
+
+    def reset_player(self):
         self.player.level = 1
         self.player.experience = 0
         self.player.max_health = 100
@@ -103,21 +168,25 @@ class Game:
         self.player.defense = 5
         self.player.x, self.player.y = 400, 200
         self.player.current_room_id = 1
-        self.player.save()
-        
-        with get_db_cursor() as cursor:
-            cursor.execute("DELETE FROM enemies")
-        
-        with get_db_cursor() as cursor:
-            cursor.execute("UPDATE rooms SET visited = FALSE")
-        
-        self.current_room = Room.load(self.player.current_room_id)
-        self.enemies = []
-        self.generate_enemies_for_room(self.current_room)
-        self.current_room.visited = True
-        self.current_room.save()
+        self.player_store.flush(force=True)
+
+    def restart_game(self):
+        self.reset_player()
         
-        self.center_enemies()
+        with self.pregen.lock:
+            persistence.call("delete_all_enemies")
+            persistence.call("reset_visited")
+            room_cache.clear()
+            self.pregen.reset()
+
+            self.current_room = Room.load(self.player.current_room_id)
+            self.set_enemies(EnemyGroup(self.current_room.id))
+            self.generate_enemies_for_room(self.current_room)
+            self.current_room.visited = True
+            self.current_room.save()
+
+            self.center_enemies()
+        self.pregen.schedule(self.current_room)
         self.messages.clear()
         self.game_state = 'exploration'
         self.current_battle = None
@@ -126,18 +195,15 @@ class Game:
         new_x = self.player.x + dx * Player.MOVE_SPEED
         new_y = self.player.y + dy * Player.MOVE_SPEED
 
+        # Гравець, що стоїть, не змінюється і не позначається для запису
+        if (new_x, new_y) == (self.player.x, self.player.y):
+            return
         player_rect = pygame.Rect(new_x, new_y, 40, 40)
 
-        collision = False
-        for wall in self.current_room.walls:
-            if player_rect.colliderect(wall.rect):
-                collision = True
-                break
-
-        if not collision:
+        if not self.current_room.collides_wall(player_rect):
             self.player.x = new_x
             self.player.y = new_y
-            self.player.save()
+            self.player_store.mark_dirty()
 
     def update_room(self):
         if not self.transitioning or not self.transition_direction:
@@ -148,75 +214,56 @@ class Game:
         self.move_to_room(direction)
 
     def move_to_room(self, direction):
-        current_direction_id = getattr(self.current_room, f"{direction}_room_id")
-
-        if current_direction_id in (None, -1):
-            new_room = Room.create(prev_room=self.current_room, from_direction=direction)
-            setattr(self.current_room, f"{direction}_room_id", new_room.id)
-            self.current_room.save()
-            current_direction_id = new_room.id
-
-        self.current_room = Room.load(current_direction_id)
-
-        transition_positions = {
-            'left': (self.current_room.width - 40, self.current_room.height // 2 - 20),
-            'right': (0, self.current_room.height // 2 - 20), 
-            'up': (self.current_room.width // 2 - 20, self.current_room.height - 40),
-            'down': (self.current_room.width // 2 - 20, 0)
-        }
-
-        self.WIDTH = self.current_room.width
-        self.HEIGHT = self.current_room.height
-
-        if not self.current_room.visited:
-            self.generate_enemies_for_room(self.current_room)
-            self.current_room.visited = True
-            self.current_room.save()
-        else:
-            self.enemies = Enemy.load_all(self.current_room.id)
-            self.center_enemies()
+        # Кімната в цьому напрямку зазвичай уже згенерована наперед разом з ворогами
+        room_id = self.pregen.room_towards(self.current_room, direction)
+        with self.pregen.lock:
+            self.current_room = Room.load(room_id)
+
+            self.WIDTH = self.current_room.width
+            self.HEIGHT = self.current_room.height
+            # Позиція гравця потрібна до розміщення ворогів, щоб вони не з'являлися поруч з ним
+            self.player.x, self.player.y = self.current_room.entry_position(direction)
+
+            if not self.current_room.visited:
+                self.set_enemies(Enemy.load_all(self.current_room.id))
+                # Кімнати, скинуті після поразки, заселяються заново
+                if len(self.enemies) == 0:
+                    self.generate_enemies_for_room(self.current_room)
+                self.current_room.visited = True
+                self.current_room.save()
+            else:
+                self.set_enemies(Enemy.load_all(self.current_room.id))
+                self.center_enemies()
 
-        self.player.x, self.player.y = transition_positions[direction]
-        self.player.current_room_id = self.current_room.id
-        self.player.save()
+            self.player.current_room_id = self.current_room.id
+            self.player_store.flush(force=True)
+            Room.prefetch_neighbours(self.current_room)
 
+        self.pregen.schedule(self.current_room)
         self.transitioning = False
 
 
 
-    def generate_enemies_for_room(self, room):
-        self.enemies = []
-        while len(self.enemies) < 1:
-            enemy_x = random.randint(0, room.width - 40)
-            enemy_y = random.randint(0, room.height - 40)
-            
-            if not room.is_wall(enemy_x, enemy_y):
-                enemy = Enemy.create(x=enemy_x, y=enemy_y, health=50, attack=10, defense=5, current_room_id=room.id)
-                self.enemies.append(enemy)
+    def spawn_positions(self, room, count):
+        return sample_positions(room, count, min_spacing=MIN_ENEMY_SPACING,
+                                avoid=[(self.player.x, self.player.y)], avoid_distance=PLAYER_SAFE_DISTANCE)
+
+    def generate_enemies_for_room(self, room, count=1):
+        spawn_enemies(room, count, avoid=(self.player.x, self.player.y))
+        self.set_enemies(Enemy.load_all(room.id))
 
     def center_enemies(self):
-        for enemy in self.enemies:
-            max_attempts = 100
-            attempts = 0
-            while attempts < max_attempts:
-                enemy.x = random.randint(0, self.WIDTH - 40)
-                enemy.y = random.randint(0, self.HEIGHT - 40)
-                enemy_rect = pygame.Rect(enemy.x, enemy.y, 40, 40)
-                collision = False
-                for wall in self.current_room.walls:
-                    if enemy_rect.colliderect(wall.rect):
-                        collision = True
-                        break
-                if not collision:
-                    enemy.update_position()
-                    break
-                attempts += 1
-            else:
-                print("Не вдалося знайти позицію для ворога без зіткнення зі стінами.")
+        positions = self.spawn_positions(self.current_room, len(self.enemies))
+        if len(positions) < len(self.enemies):
+            print("Не вдалося знайти позицію для ворога без зіткнення зі стінами.")
+        self.enemies.set_positions(positions)
+        self.enemies.save_positions(len(positions))
 
 
 
     def get_movement(self):
+        if self.input_source is not None:
+            return self.input_source.next_movement()
         keys = pygame.key.get_pressed()
         dx, dy = 0, 0
         if keys[pygame.K_LEFT] or keys[pygame.K_a]:
@@ -242,14 +289,9 @@ class Game:
         if self.player.level >= 100:
             self.end_game_handler.end_game() 
 
-    def random_stat_improvement(self):
-        improvements = [
-            ('attack', 2, "Ви отримали +2 до атаки!"),
-            ('defense', 1, "Ви отримали +1 до захисту!"),
-            ('health_restore', 25, "Ви відновили 25 HP!"),
-            ('max_health', 10, "Ваше максимальне HP збільшено на 10!")
-        ]
-        stat, value, message = random.choice(improvements)
+    def random_stat_improvement(self, improvement=None):
+        # improvement - вже вибрана нагорода (battle_engine.resolve), інакше обирається тут
+        stat, value, message = improvement or random.choice(STAT_IMPROVEMENTS)
         if stat == 'attack':
             self.player.attack += value
         elif stat == 'defense':
@@ -261,52 +303,165 @@ class Game:
         self.add_message(message)
 
 
-    def run(self):
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    running = False
-                if self.input_active:
-                    if event.type == pygame.KEYDOWN:
-                        if event.key == pygame.K_RETURN:
-                            self.player.name = self.player_name.strip()
-                            if self.player.name:
-                                self.input_active = False
-                                self.player.save()
-                                print(f"Ім'я гравця збережено: {self.player.name}")
-                            else:
-                                self.add_message("Ім'я не може бути порожнім!")
-                        elif event.key == pygame.K_BACKSPACE:
-                            self.player_name = self.player_name[:-1]
+    def handle_events(self):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                self.running = False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.show_profiler = not self.show_profiler
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                self.profiler.export(self.profile_output or "profile.json")
+                self.add_message("Профіль кадрів збережено.")
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F5 and not self.input_active:
+                self.save_snapshot()
+                continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE and self.current_battle and not self.input_active:
+                self.current_battle.skip()
+                continue
+            if self.input_active:
+                if event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_RETURN:
+                        self.player.name = self.player_name.strip()
+                        if self.player.name:
+                            self.input_active = False
+                            self.player_store.flush(force=True)
+                            print(f"Ім'я гравця збережено: {self.player.name}")
                         else:
-                            self.player_name += event.unicode
-
+                            self.add_message("Ім'я не може бути порожнім!")
+                    elif event.key == pygame.K_BACKSPACE:
+                        self.player_name = self.player_name[:-1]
+                    else:
+                        self.player_name += event.unicode
+
+    def update(self):
+        with self.profiler.phase("timers"):
+            self.scheduler.run_due()
+        error = persistence.take_error()
+        if error:
+            self.add_message(f"Не вдалося зберегти зміни: {error}")
+        if self.input_active:
+            return
+        if self.game_state == 'exploration':
+            with self.profiler.phase("handle_collisions"):
+                self.handle_collisions()
+            with self.profiler.phase("update_room"):
+                self.update_room()
+            with self.profiler.phase("move_player"):
+                dx, dy = self.get_movement()
+                self.move_player(dx, dy)
+        elif self.game_state == 'game_over':
+            self.end_game_handler.game_over()
+        self.player_store.maybe_flush()
+
+    def render(self):
+        if self.input_active:
             self.screen.fill((0, 0, 0)) 
-
-            if self.input_active:
-                self.renderer.draw_text_input(self.player_name) 
-            else:
-                if self.game_state == 'exploration':
-                    self.handle_collisions()
-                    self.update_room()
-                    dx, dy = self.get_movement()
-                    self.move_player(dx, dy)
-                elif self.game_state == 'battle':
-                    self.current_battle.update()
-                elif self.game_state == 'game_over':
-                    self.end_game_handler.game_over()
-                
+            self.renderer.draw_text_input(self.player_name) 
+        else:
+            with self.profiler.phase("draw_room"):
                 self.renderer.draw_room()
-                self.player_sprite.update_animation("down")
-                self.player_sprite.draw(self.screen, self.player.x, self.player.y) 
 
-            pygame.display.flip()
-            self.clock.tick(60)
+        if self.show_profiler:
+            self.renderer.draw_profiler_overlay(self.profiler)
+
+        with self.profiler.phase("flip"):
+            self.renderer.present()
+
+    def save_snapshot(self):
+        # Резервна копія світу: гравець записується одразу, решта - після черги записів
+        self.player_store.flush()
+        try:
+            counts = export_snapshot(self.snapshot_path)
+        except (OSError, SnapshotError) as e:
+            self.add_message(f"Помилка збереження знімка: {e}")
+            return
+        self.add_message(f"Світ збережено: {counts['rooms']} кімнат.")
+
+    def advance_time(self):
+        self.time.advance()
+
+    def run(self, max_frames=None):
+        self.running = True
+        frames = 0
+        while self.running:
+            self.profiler.begin_frame()
+            with self.profiler.phase("events"):
+                self.handle_events()
+            self.update()
+            if self.render_enabled:
+                self.render()
+            self.profiler.end_frame()
+            self.advance_time()
+            frames += 1
+            if max_frames is not None and frames >= max_frames:
+                break
 
+        # Фонова генерація кімнат пише в сховище, тож зупиняється першою
+        self.pregen.stop()
+        self.player_store.flush()
+        if self.profile_output:
+            self.profiler.export(self.profile_output)
+        # Перед закриттям сховища дописуємо всю чергу
+        persistence.stop()
+        get_backend().close()
         pygame.quit()
+        return frames
+
+    def simulate(self, frames):
+        # Пропускна здатність ядра симуляції (кадрів за секунду реального часу)
+        start = time.perf_counter()
+        frames = self.run(max_frames=frames)
+        elapsed = time.perf_counter() - start
+        return frames / elapsed if elapsed > 0 else float('inf')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", action="store_true", help="запуск без вікна")
+    parser.add_argument("--storage", default=None, choices=sorted(BACKENDS),
+                        help="сховище (типово RPG_STORAGE; з --headless - memory)")
+    parser.add_argument("--no-render", action="store_true", help="не малювати кадри")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--timestep", type=int, default=None, help="крок змодельованого часу, мс")
+    parser.add_argument("--frames", type=int, default=None, help="кількість кадрів симуляції")
+    parser.add_argument("--profile-output", default=None, help="файл профілю кадрів (.json або .csv)")
+    parser.add_argument("--snapshot", default=None,
+                        help="грати світ зі знімка без БД: кімнати читаються з файлу при зверненні, "
+                             "зміни записуються в нього при виході та F5")
+    parser.add_argument("--restore", default=None,
+                        help="замінити світ у сховищі знімком перед стартом (увесь поточний прогрес буде втрачено)")
+    parser.add_argument("--startup-report", action="store_true", help="надрукувати час кроків запуску")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
+    args = parse_args()
+    if args.snapshot:
+        STORAGE_CONFIG["backend"] = "snapshot"
+        STORAGE_CONFIG["snapshot_path"] = args.snapshot
+    elif args.storage:
+        STORAGE_CONFIG["backend"] = args.storage
+    elif args.headless and "RPG_STORAGE" not in os.environ:
+        # Симуляція без явно вибраного сховища не перезаписує збережену гру
+        STORAGE_CONFIG["backend"] = "memory"
+    if args.restore:
+        try:
+            counts = import_snapshot(args.restore)
+        except (OSError, SnapshotError) as e:
+            raise SystemExit(f"Не вдалося відновити світ зі знімка: {e}")
+        print(f"Світ відновлено зі знімка: {counts['rooms']} кімнат, {counts['enemies']} ворогів")
+    if args.headless:
+        game = Game(headless=True, render=not args.no_render, seed=args.seed,
+                    input_source=RandomWalkInput(args.seed), timestep=args.timestep or 16)
+    else:
+        game = Game(seed=args.seed, timestep=args.timestep)
+    game.profile_output = args.profile_output
+    if args.startup_report:
+        print(game.startup.report())
+    if args.headless:
+        ticks_per_second = game.simulate(args.frames or 10000)
+        print(f"Симуляція: {ticks_per_second:.0f} кадрів/с")
+    else:
+        game.run(max_frames=args.frames)
@@ -0,0 +1,266 @@
+import argparse
+import sys
+
+# Версійовані зміни схеми. Кожна міграція виконується один раз, у тій самій транзакції,
+# що й запис її номера в schema_version; initialize() сховищ застосовує лише ще не виконані.
+# Зв'язки кімнат (up/down/left/right_room_id) лишаються без зовнішніх ключів:
+# -1 означає вихід до ще не згенерованої кімнати
+
+
+class Migration:
+    def __init__(self, version, name, postgres, sqlite):
+        self.version = version
+        self.name = name
+        self.postgres = postgres
+        self.sqlite = sqlite
+
+    def statements(self, dialect):
+        return getattr(self, dialect)
+
+
+MIGRATIONS = (
+    Migration(1, "початкова схема", postgres=(
+        """
+        CREATE TABLE IF NOT EXISTS rooms (
+            id SERIAL PRIMARY KEY,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            up_room_id INTEGER,
+            down_room_id INTEGER,
+            left_room_id INTEGER,
+            right_room_id INTEGER,
+            visited BOOLEAN DEFAULT FALSE
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS player (
+            id SERIAL PRIMARY KEY,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            health INTEGER DEFAULT 100,
+            max_health INTEGER DEFAULT 100,
+            attack INTEGER DEFAULT 10,
+            defense INTEGER DEFAULT 5,
+            experience INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            current_room_id INTEGER DEFAULT 1,
+            name VARCHAR(50) DEFAULT ''
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS enemies (
+            id SERIAL PRIMARY KEY,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            health INTEGER DEFAULT 50,
+            attack INTEGER DEFAULT 8,
+            defense INTEGER DEFAULT 5,
+            current_room_id INTEGER NOT NULL
+        )
+        """,
+    ), sqlite=(
+        """
+        CREATE TABLE IF NOT EXISTS rooms (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            up_room_id INTEGER,
+            down_room_id INTEGER,
+            left_room_id INTEGER,
+            right_room_id INTEGER,
+            visited BOOLEAN DEFAULT 0
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS player (
+            id INTEGER PRIMARY KEY,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            health INTEGER DEFAULT 100,
+            max_health INTEGER DEFAULT 100,
+            attack INTEGER DEFAULT 10,
+            defense INTEGER DEFAULT 5,
+            experience INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            current_room_id INTEGER DEFAULT 1,
+            name VARCHAR(50) DEFAULT ''
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS enemies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            x INTEGER NOT NULL,
+            y INTEGER NOT NULL,
+            health INTEGER DEFAULT 50,
+            attack INTEGER DEFAULT 8,
+            defense INTEGER DEFAULT 5,
+            current_room_id INTEGER NOT NULL
+        )
+        """,
+    )),
+    # Enemy.load_all шукає ворогів за кімнатою - без індексу це послідовне сканування всієї таблиці.
+    # Перед зовнішніми ключами прибираються рядки, що посилаються на неіснуючі кімнати
+    Migration(2, "індекс ворогів за кімнатою, зовнішні ключі", postgres=(
+        "CREATE INDEX IF NOT EXISTS enemies_current_room_idx ON enemies (current_room_id)",
+        "DELETE FROM enemies WHERE current_room_id NOT IN (SELECT id FROM rooms)",
+        """
+        ALTER TABLE enemies ADD CONSTRAINT enemies_current_room_fk
+        FOREIGN KEY (current_room_id) REFERENCES rooms (id) ON DELETE CASCADE
+        """,
+        """
+        UPDATE player SET current_room_id = (SELECT MIN(id) FROM rooms)
+        WHERE current_room_id NOT IN (SELECT id FROM rooms)
+        """,
+        """
+        ALTER TABLE player ADD CONSTRAINT player_current_room_fk
+        FOREIGN KEY (current_room_id) REFERENCES rooms (id)
+        """,
+    ), sqlite=(
+        # SQLite не додає обмеження до наявної таблиці (лише через її перебудову), тож тут тільки індекс
+        "CREATE INDEX IF NOT EXISTS enemies_current_room_idx ON enemies (current_room_id)",
+    )),
+)
+
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+SCHEMA_VERSION_TABLE = {
+    "postgres": """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT now()
+        )
+    """,
+    "sqlite": """
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+PLACEHOLDER = {"postgres": "%s", "sqlite": "?"}
+# Ключ pg_advisory_xact_lock: кілька процесів, що стартують одночасно, мігрують по черзі
+MIGRATION_LOCK = 24024
+
+
+def current_version(cursor, dialect):
+    # 0 - схема ще не створювалась (таблиці schema_version немає)
+    if dialect == "postgres":
+        cursor.execute("SELECT to_regclass('schema_version') IS NOT NULL")
+        exists = cursor.fetchone()[0]
+    else:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'")
+        exists = cursor.fetchone() is not None
+    if not exists:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    return cursor.fetchone()[0]
+
+
+def migrate(cursor, dialect, target=SCHEMA_VERSION):
+    # Повертає номери застосованих міграцій; при актуальній схемі - лише перевірка версії
+    version = current_version(cursor, dialect)
+    if version >= target:
+        return []
+    if dialect == "postgres":
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MIGRATION_LOCK,))
+        version = current_version(cursor, dialect)
+    cursor.execute(SCHEMA_VERSION_TABLE[dialect])
+    applied = []
+    for migration in MIGRATIONS:
+        if version < migration.version <= target:
+            for statement in migration.statements(dialect):
+                cursor.execute(statement)
+            cursor.execute(f"INSERT INTO schema_version (version) VALUES ({PLACEHOLDER[dialect]})",
+                           (migration.version,))
+            applied.append(migration.version)
+    return applied
+
+
+# Гарячі запити, які мають іти через індекс, а не сканувати таблицю:
+# назва -> (таблиця, параметри, запит SQLite). У PostgreSQL перевіряється сам prepared statement
+# з PostgresBackend.PREPARED (EXPLAIN EXECUTE) з цими параметрами; запити SQLite - ті, що виконує SQLiteBackend
+EXPLAIN_CHECKS = {
+    "load_enemies": ("enemies", ([1, 2],),
+                     "SELECT id, x, y FROM enemies WHERE current_room_id IN (1, 2)"),
+    "load_rooms": ("rooms", ([1, 2],),
+                   "SELECT id, visited FROM rooms WHERE id IN (1, 2)"),
+    "load_player": ("player", (1,),
+                    "SELECT x, y FROM player WHERE id = 1"),
+    "update_enemy_positions": ("enemies", ([1, 2], [0, 0], [0, 0]),
+                               "UPDATE enemies SET x = 0, y = 0 WHERE id = 1"),
+}
+
+
+def explain(cursor, dialect, name):
+    table, params, sqlite_query = EXPLAIN_CHECKS[name]
+    if dialect == "postgres":
+        import database
+        from storage import PostgresBackend
+
+        param_types, query = PostgresBackend.PREPARED[name]
+        database.prepare(cursor, name, param_types, query)
+        # На маленьких таблицях планувальник і так обирає сканування; з enable_seqscan = off
+        # Seq Scan у плані лишається лише тоді, коли придатного індексу немає
+        cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute(f"EXPLAIN EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        return [row[0] for row in cursor.fetchall()]
+    cursor.execute(f"EXPLAIN QUERY PLAN {sqlite_query}")
+    return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scan(plan, dialect, table):
+    if dialect == "postgres":
+        return any(f"Seq Scan on {table}" in line for line in plan)
+    return any(line.startswith(f"SCAN {table}") for line in plan)
+
+
+def check_plans(cursor, dialect):
+    # Список (назва, план, чи є повне сканування таблиці)
+    results = []
+    for name, (table, _, _) in EXPLAIN_CHECKS.items():
+        plan = explain(cursor, dialect, name)
+        results.append((name, plan, full_scan(plan, dialect, table)))
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Міграції схеми та перевірка планів запитів")
+    parser.add_argument("command", choices=("status", "migrate", "explain"))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    from storage import get_backend
+
+    args = parse_args(argv)
+    backend = get_backend()
+    if backend.name not in PLACEHOLDER:
+        print(f"Сховище {backend.name} не має схеми БД")
+        return 0
+    status = 0
+    with backend.cursor() as cursor:
+        if args.command == "status":
+            version = current_version(cursor, backend.name)
+            for migration in MIGRATIONS:
+                mark = "+" if migration.version <= version else " "
+                print(f"[{mark}] {migration.version}: {migration.name}")
+        elif args.command == "migrate":
+            applied = migrate(cursor, backend.name)
+            print(f"Застосовано міграції: {applied}" if applied else "Схема актуальна")
+        else:
+            for name, plan, scan in check_plans(cursor, backend.name):
+                print(f"{'ПОВНЕ СКАНУВАННЯ' if scan else 'індекс':16} {name}")
+                for line in plan:
+                    print(f"    {line}")
+                if scan:
+                    status = 1
+    backend.close()
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
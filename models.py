@@ -1,9 +1,97 @@
-from database import get_db_cursor
+import os
 import random
+import numpy as np
 import pygame
+from cache import LRUCache
+from persistence import persistence
+from spatial import SpatialHash
 from world import PlayerSprite
 
+
+class RoomCacheEntry:
+    __slots__ = ("room", "enemies")
+
+    def __init__(self):
+        self.room = None
+        self.enemies = None
+
+
+class RoomCache:
+    # Кеш кімнат у пам'яті: для кожної кімнати зберігається сам об'єкт Room
+    # і список її ворогів, щоб переходи між кімнатами не чекали на БД
+    def __init__(self, maxsize=64):
+        self.entries = LRUCache(maxsize)
+
+    def _entry(self, room_id):
+        with self.entries.lock:
+            entry = self.entries.get(room_id)
+            if entry is None:
+                entry = RoomCacheEntry()
+                self.entries.put(room_id, entry)
+            return entry
+
+    def get_room(self, room_id):
+        entry = self.entries.get(room_id)
+        return entry.room if entry else None
+
+    def put_room(self, room):
+        self._entry(room.id).room = room
+
+    def get_enemies(self, room_id):
+        entry = self.entries.get(room_id)
+        return entry.enemies if entry else None
+
+    def put_enemies(self, room_id, enemies):
+        self._entry(room_id).enemies = enemies
+
+    def clear(self):
+        self.entries.clear()
+
+
+# maxsize - скільки кімнат з ворогами тримати в пам'яті (RPG_ROOM_CACHE_SIZE)
+ROOM_CACHE_CONFIG = {
+    "maxsize": int(os.environ.get("RPG_ROOM_CACHE_SIZE", 64))
+}
+
+room_cache = RoomCache(ROOM_CACHE_CONFIG["maxsize"])
+
+
+class WallLayout:
+    # Спільний незмінний шаблон стін (flyweight): усі кімнати одного розміру посилаються
+    # на один об'єкт зі стінами, їхнім просторовим індексом і масками появи ворогів
+    __slots__ = ("id", "width", "height", "walls", "wall_index", "spawn_masks")
+    layouts = {}
+
+    def __init__(self, layout_id, width, height):
+        self.id = layout_id
+        self.width = width
+        self.height = height
+        self.walls = tuple(self.create_walls())
+        self.wall_index = SpatialHash()
+        for wall in self.walls:
+            self.wall_index.insert(wall, wall.rect)
+        # Маски вільного місця для появи ворогів (spawn.spawn_mask), за розміром
+        self.spawn_masks = {}
+
+    def create_walls(self):
+        walls = []
+        walls.append(Wall(0, 0, 300, 200))
+        walls.append(Wall(self.width - 300, 0, 300, 200))
+        walls.append(Wall(0, self.height - 200, 300, 200))
+        walls.append(Wall(self.width - 300, self.height - 200, 300, 200))
+        return walls
+
+    @classmethod
+    def get(cls, width, height):
+        layout = cls.layouts.get((width, height))
+        if layout is None:
+            layout = cls.layouts.setdefault((width, height), cls(len(cls.layouts) + 1, width, height))
+        return layout
+
 class Room:
+    __slots__ = ("id", "x", "y", "width", "height", "up_room_id", "down_room_id",
+                 "left_room_id", "right_room_id", "visited", "layout")
+
     def __init__(self, id, x, y, width, height, up_room_id, down_room_id, left_room_id, right_room_id, visited=False):
         self.id = id
         self.x = x
@@ -15,133 +103,148 @@ class Room:
         self.left_room_id = left_room_id
         self.right_room_id = right_room_id
         self.visited = visited
-        self.walls = self.create_walls()
+        # Стіни, їхній індекс і маски появи ворогів спільні для всіх кімнат цього розміру
+        self.layout = WallLayout.get(width, height)
 
-    def create_walls(self):
-        walls = []
-        walls.append(Wall(0, 0, 300, 200))
-        walls.append(Wall(self.width - 300, 0, 300, 200))
-        walls.append(Wall(0, self.height - 200, 300, 200))
-        walls.append(Wall(self.width - 300, self.height - 200, 300, 200))
-        return walls
-    
-    def is_wall(self, x, y):
-        for wall in self.walls:
-            if wall.rect.collidepoint(x, y):
-                return True
-        return False
+    @property
+    def walls(self):
+        return self.layout.walls
+
+    @property
+    def wall_index(self):
+        return self.layout.wall_index
+
+    @property
+    def spawn_masks(self):
+        return self.layout.spawn_masks
+
+    def collides_wall(self, rect):
+        return bool(self.wall_index.query_rect(rect))
 
     @classmethod
-    def create(cls, prev_room=None, from_direction=None):
-        with get_db_cursor() as cursor:
-
-            new_room = cls(
-                id=None, 
-                x=0, y=0,  
-                width=800,
-                height=600,
-                up_room_id=None,
-                down_room_id=None,
-                left_room_id=None,
-                right_room_id=None
-            )
-
-            cursor.execute("""
-                INSERT INTO rooms 
-                (x, y, width, height, up_room_id, down_room_id, left_room_id, right_room_id)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (new_room.x, new_room.y, new_room.width, new_room.height,
-                  new_room.up_room_id, new_room.down_room_id, 
-                  new_room.left_room_id, new_room.right_room_id))
-            new_room.id = cursor.fetchone()[0]
-
-            if prev_room and from_direction:
-                opposite_dir = {'left': 'right', 'right': 'left', 
-                               'up': 'down', 'down': 'up'}[from_direction]
-                setattr(new_room, f"{opposite_dir}_room_id", prev_room.id)
-                setattr(prev_room, f"{from_direction}_room_id", new_room.id)
-                
-                cursor.execute(f"""
-                    UPDATE rooms 
-                    SET {from_direction}_room_id = %s 
-                    WHERE id = %s
-                """, (new_room.id, prev_room.id))
-            
-
-            directions = ['up', 'down', 'left', 'right']
-            if opposite_dir in directions:
-                directions.remove(opposite_dir)
-            new_directions = random.sample(directions, k=random.randint(1, 3))
-            
-            for dir in new_directions:
-                setattr(new_room, f"{dir}_room_id", -1)  # Заглушка для майбутніх кімнат
-            
-            cursor.execute("""
-                UPDATE rooms SET
-                    up_room_id = %s,
-                    down_room_id = %s,
-                    left_room_id = %s,
-                    right_room_id = %s
-                WHERE id = %s
-            """, (new_room.up_room_id, new_room.down_room_id,
-                 new_room.left_room_id, new_room.right_room_id,
-                 new_room.id))
-            
+    def create(cls, prev_room=None, from_direction=None, rng=random):
+        new_room = cls(
+            id=None, 
+            x=0, y=0,  
+            width=800,
+            height=600,
+            up_room_id=None,
+            down_room_id=None,
+            left_room_id=None,
+            right_room_id=None
+        )
+
+        # Усі зв'язки обчислюються до запису, щоб зберегти кімнату одним запитом
+        opposite_dir = None
+        if prev_room and from_direction:
+            opposite_dir = {'left': 'right', 'right': 'left', 
+                           'up': 'down', 'down': 'up'}[from_direction]
+            setattr(new_room, f"{opposite_dir}_room_id", prev_room.id)
+
+        directions = ['up', 'down', 'left', 'right']
+        if opposite_dir in directions:
+            directions.remove(opposite_dir)
+        new_directions = rng.sample(directions, k=rng.randint(1, 3))
+        
+        for dir in new_directions:
+            setattr(new_room, f"{dir}_room_id", -1)  # Заглушка для майбутніх кімнат
+
+        if new_room.right_room_id is None:
             new_room.right_room_id = -1  # Заглушка для наступних кімнат
-            new_room.save()
-            
-            return new_room
+
+        link = (prev_room.id, from_direction) if opposite_dir else None
+        # Збереження попередньої кімнати, що ще в черзі, записало б старий зв'язок поверх нового
+        new_room.id = persistence.call("insert_room", new_room.to_dict(), link,
+                                       after=[("room", prev_room.id)] if link else ())
+
+        # Нова кімната ще не має ворогів; в кеш вона потрапляє раніше, ніж посилання на неї.
+        # Об'єкт prev_room не змінюється: зв'язок у пам'яті ставить RoomPregenerator.link під lock
+        room_cache.put_room(new_room)
+        room_cache.put_enemies(new_room.id, EnemyGroup(new_room.id))
+
+        return new_room
+
+    def entry_position(self, direction):
+        # Де з'являється гравець, коли входить у кімнату, рухаючись у напрямку direction
+        return {
+            'left': (self.width - 40, self.height // 2 - 20),
+            'right': (0, self.height // 2 - 20),
+            'up': (self.width // 2 - 20, self.height - 40),
+            'down': (self.width // 2 - 20, 0)
+        }[direction]
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'x': self.x,
+            'y': self.y,
+            'width': self.width,
+            'height': self.height,
+            'up_room_id': self.up_room_id,
+            'down_room_id': self.down_room_id,
+            'left_room_id': self.left_room_id,
+            'right_room_id': self.right_room_id,
+            'visited': self.visited
+        }
+
+    @classmethod
+    def from_dict(cls, room_dict):
+        return cls(
+            id=room_dict['id'],
+            x=room_dict['x'],
+            y=room_dict['y'],
+            width=room_dict['width'],
+            height=room_dict['height'],
+            up_room_id=room_dict['up_room_id'],
+            down_room_id=room_dict['down_room_id'],
+            left_room_id=room_dict['left_room_id'],
+            right_room_id=room_dict['right_room_id'],
+            visited=room_dict['visited']
+        )
+
     @classmethod
     def load(cls, current_room_id):
-        with get_db_cursor() as cursor:
-            cursor.execute("SELECT * FROM rooms WHERE id = %s", (current_room_id,))
-            room_data = cursor.fetchone()
-            
-            if room_data:
-                columns = [desc[0] for desc in cursor.description]
-                room_dict = dict(zip(columns, room_data))
-                
-                return cls(
-                    id=room_dict['id'],
-                    x=room_dict['x'],
-                    y=room_dict['y'],
-                    width=room_dict['width'],
-                    height=room_dict['height'],
-                    up_room_id=room_dict['up_room_id'],
-                    down_room_id=room_dict['down_room_id'],
-                    left_room_id=room_dict['left_room_id'],
-                    right_room_id=room_dict['right_room_id'],
-                    visited=room_dict['visited']
-                )
-            return None
+        room = room_cache.get_room(current_room_id)
+        if room is not None:
+            return room
+
+        room_data = persistence.call("load_room", current_room_id, after=[("room", current_room_id)])
+        if room_data:
+            room = cls.from_dict(room_data)
+            room_cache.put_room(room)
+            return room
+        return None
+
+    def neighbour_ids(self):
+        ids = [self.up_room_id, self.down_room_id, self.left_room_id, self.right_room_id]
+        return [room_id for room_id in ids if room_id not in (None, -1)]
+
+    @classmethod
+    def prefetch_neighbours(cls, room):
+        missing = [room_id for room_id in room.neighbour_ids() if room_cache.get_room(room_id) is None]
+        if not missing:
+            return
+        for room_data in persistence.call("load_rooms", missing, after=[("room", room_id) for room_id in missing]):
+            room_cache.put_room(cls.from_dict(room_data))
+
+        rows_by_room = {room_id: [] for room_id in missing}
+        for data in persistence.call("load_enemies", missing, after=[("enemy", room_id) for room_id in missing]):
+            rows_by_room[data[6]].append(data)
+        for room_id, rows in rows_by_room.items():
+            room_cache.put_enemies(room_id, EnemyGroup(room_id, rows))
+
     def save(self):
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                UPDATE rooms SET
-                    x = %s,
-                    y = %s,
-                    width = %s,
-                    height = %s,
-                    up_room_id = %s,
-                    down_room_id = %s,
-                    left_room_id = %s,
-                    right_room_id = %s,
-                    visited = %s
-                WHERE id = %s
-            """, (
-                self.x, self.y, self.width, self.height,
-                self.up_room_id, self.down_room_id,
-                self.left_room_id, self.right_room_id,
-                self.visited,
-                self.id
-            ))
+        persistence.submit(("room", self.id), "save_room", self.to_dict())
+        room_cache.put_room(self)
 
     
 class Player:
     MOVE_SPEED = 5
+    __slots__ = ("id", "x", "y", "current_room_id", "health", "max_health", "attack", "defense",
+                 "experience", "level", "name", "direction", "sprite")
 
-    def __init__(self, x, y, current_room_id=1, health=100, max_health=100, attack=10, defense=5, experience=0, level=1, name="", sprite_path="default_path"):
+    def __init__(self, x, y, current_room_id=1, health=100, max_health=100, attack=10, defense=5, experience=0, level=1, name="", sprite_path="default_path", player_id=1):
+        self.id = player_id
         self.x = x
         self.y = y
         self.current_room_id = current_room_id
@@ -156,45 +259,82 @@ class Player:
         self.sprite = PlayerSprite(sprite_path)
 
     @classmethod
-    def load(cls, name=None):
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                SELECT x, y, current_room_id, health, max_health, attack, defense, experience, level, name
-                FROM player WHERE id = 1
-            """)
-            data = cursor.fetchone()
-            if data is None:
-                print("Гравець не знайдений у БД. Створюємо нового...")
-                player = cls(350, 200, name=name, sprite_path="images/player.gif")
-                player.save()
-                return player
-            else:
-                x, y, current_room_id, health, max_health, attack, defense, experience, level, name_from_db = data
-                if name:
-                    name = name_from_db
-                print(f"Дані завантажені з БД: {data}")
-                return cls(x, y, current_room_id, health, max_health, attack, defense, experience, level, name, sprite_path="images/player.gif")
+    def load(cls, name=None, player_id=1):
+        data = persistence.call("load_player", player_id, after=[("player", player_id)])
+        if data is None:
+            print("Гравець не знайдений у БД. Створюємо нового...")
+            player = cls(350, 200, name=name, sprite_path="images/player.gif", player_id=player_id)
+            player.save()
+            return player
+        else:
+            if name:
+                name = data['name']
+            print(f"Дані завантажені з БД: {tuple(data.values())}")
+            return cls(data['x'], data['y'], data['current_room_id'], data['health'], data['max_health'],
+                       data['attack'], data['defense'], data['experience'], data['level'], name,
+                       sprite_path="images/player.gif", player_id=player_id)
+
+    def to_dict(self):
+        return {
+            'x': self.x,
+            'y': self.y,
+            'current_room_id': self.current_room_id,
+            'health': self.health,
+            'max_health': self.max_health,
+            'attack': self.attack,
+            'defense': self.defense,
+            'experience': self.experience,
+            'level': self.level,
+            'name': self.name
+        }
 
     def save(self, name=None):
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO player (id, x, y, health, max_health, attack, defense, experience, level, current_room_id, name)
-                VALUES (1, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                ON CONFLICT (id) DO UPDATE SET
-                    x = EXCLUDED.x,
-                    y = EXCLUDED.y,
-                    health = EXCLUDED.health,
-                    max_health = EXCLUDED.max_health,
-                    attack = EXCLUDED.attack,
-                    defense = EXCLUDED.defense,
-                    experience = EXCLUDED.experience,
-                    level = EXCLUDED.level,
-                    current_room_id = EXCLUDED.current_room_id,
-                    name = EXCLUDED.name
-            """, (self.x, self.y, self.health, self.max_health, self.attack, self.defense, self.experience, self.level, self.current_room_id, self.name))
+        persistence.submit(("player", self.id), "save_player", self.id, self.to_dict())
     
 
+class PlayerWriteBehind:
+    # Відкладене збереження гравця: рух лише позначає гравця "брудним",
+    # а в БД іде один upsert не частіше ніж раз на flush_interval мс
+    def __init__(self, player, flush_interval=500, clock=None):
+        self.player = player
+        self.clock = clock
+        self.flush_interval = flush_interval
+        self.dirty = False
+        self.dirty_since = None
+        self.flush_count = 0
+
+    def now(self):
+        return self.clock.now() if self.clock else pygame.time.get_ticks()
+
+    def mark_dirty(self):
+        if not self.dirty:
+            self.dirty = True
+            self.dirty_since = self.now()
+
+    def maybe_flush(self, current_time=None):
+        if not self.dirty:
+            return False
+        if current_time is None:
+            current_time = self.now()
+        # Максимальне вікно втрати даних - flush_interval мс від першої незбереженої зміни
+        if current_time - self.dirty_since >= self.flush_interval:
+            self.flush()
+            return True
+        return False
+
+    def flush(self, force=False):
+        if not self.dirty and not force:
+            return False
+        self.player.save()
+        self.dirty = False
+        self.dirty_since = None
+        self.flush_count += 1
+        return True
+
+
 class Enemy:
+    __slots__ = ("id", "x", "y", "health", "attack", "defense", "current_room_id")
+
     def __init__(self, id, x, y, health, attack, defense, current_room_id):
         self.id = id
         self.x = x
@@ -203,42 +343,217 @@ class Enemy:
         self.attack = attack
         self.defense = defense
         self.current_room_id = current_room_id
-        
+
+    @property
+    def rect(self):
+        return pygame.Rect(self.x, self.y, 40, 40)
 
     @classmethod
     def load_all(cls, current_room_id):
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                SELECT id, x, y, health, attack, defense, current_room_id FROM enemies WHERE current_room_id = %s
-            """, (current_room_id,))
-            enemies_data = cursor.fetchall()
-            enemies = [cls(*data) for data in enemies_data]
+        enemies = room_cache.get_enemies(current_room_id)
+        if enemies is not None:
             return enemies
 
+        enemies = EnemyGroup(current_room_id, persistence.call("load_enemies", [current_room_id],
+                                                               after=[("enemy", current_room_id)]))
+        room_cache.put_enemies(current_room_id, enemies)
+        return enemies
+
     @classmethod
-    def create(cls, x, y, health, attack, defense, current_room_id):
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                INSERT INTO enemies (x, y, health, attack, defense, current_room_id)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING id
-            """, (x, y, health, attack, defense, current_room_id))
-            enemy_id = cursor.fetchone()[0]
-
-        return cls(enemy_id, x, y, health, attack, defense, current_room_id)
-
-    def update_position(self):
-        with get_db_cursor() as cursor:
-            cursor.execute("""
-                UPDATE enemies SET x = %s, y = %s WHERE id = %s
-            """, (self.x, self.y, self.id))
+    def create_many(cls, enemies_data):
+        # enemies_data - список кортежів (x, y, health, attack, defense, current_room_id)
+        if not enemies_data:
+            return []
+        # Нові рядки не залежать від записів у черзі
+        ids = persistence.call("create_enemies", enemies_data, after=())
+        rows = [(enemy_id,) + tuple(data) for enemy_id, data in zip(ids, enemies_data)]
+
+        # Вороги кімнат, що вже є в кеші, дописуються в їхні групи і повертаються як EnemyView
+        rows_by_room = {}
+        for row in rows:
+            rows_by_room.setdefault(row[6], []).append(row)
+        for room_id, room_rows in rows_by_room.items():
+            group = room_cache.get_enemies(room_id)
+            if group is not None:
+                group.extend(room_rows)
+
+        enemies = []
+        for row in rows:
+            group = room_cache.get_enemies(row[6])
+            enemies.append(group.view(row[0]) if group is not None else cls(*row))
+        return enemies
 
     def delete(self):
-        with get_db_cursor() as cursor:
-            cursor.execute("DELETE FROM enemies WHERE id = %s", (self.id,))
+        persistence.submit(("enemy", self.current_room_id, self.id), "delete_enemy", self.id)
+        cached = room_cache.get_enemies(self.current_room_id)
+        if cached is not None:
+            cached.remove(self.id)
+
+
+def _column_property(name):
+    def getter(self):
+        if self.group is None:
+            return self.values[name]
+        return int(getattr(self.group, name)[self.group.row(self.id)])
+
+    def setter(self, value):
+        if self.group is None:
+            self.values[name] = value
+        else:
+            getattr(self.group, name)[self.group.row(self.id)] = value
+
+    return property(getter, setter)
+
+
+class EnemyView(Enemy):
+    # Тонкий Enemy поверх рядка EnemyGroup для коду, що працює з одним ворогом (Battle).
+    # Після видалення з групи view зберігає останні значення у себе
+    __slots__ = ("group", "values")
+
+    def __init__(self, group, enemy_id):
+        self.group = group
+        self.id = enemy_id
+        self.current_room_id = group.room_id
+        self.values = None
+
+    x = _column_property('xs')
+    y = _column_property('ys')
+    health = _column_property('health')
+    attack = _column_property('attack')
+    defense = _column_property('defense')
+
+
+def _empty_column(dtype):
+    column = np.empty(0, dtype=dtype)
+    column.flags.writeable = False
+    return column
+
+
+EMPTY_COLUMNS = {dtype: _empty_column(dtype) for dtype in (np.int64, np.int32)}
+
+
+class EnemyGroup:
+    # Вороги кімнати як стовпці NumPy (struct of arrays): зіткнення, малювання
+    # та збереження позицій виконуються для всіх ворогів одразу, без циклу по об'єктах
+    # Рядки відсортовані за id, тож рядок ворога шукається бінарним пошуком без окремого словника
+    SIZE = 40
+    COLUMNS = ('ids', 'xs', 'ys', 'health', 'attack', 'defense')
+    DTYPES = (np.int64, np.int32, np.int32, np.int32, np.int32, np.int32)
+    __slots__ = COLUMNS + ("room_id", "views")
+
+    def __init__(self, room_id, rows=()):
+        # rows - кортежі у порядку ENEMY_COLUMNS (id, x, y, health, attack, defense, current_room_id)
+        self.room_id = room_id
+        self.views = None
+        self._set_columns(list(rows))
+
+    def _set_columns(self, rows):
+        if not rows:
+            # Порожні кімнати ділять одні й ті самі масиви нульової довжини (тільки для читання)
+            for name, dtype in zip(self.COLUMNS, self.DTYPES):
+                setattr(self, name, EMPTY_COLUMNS[dtype])
+            return
+        data = np.array([row[:6] for row in rows], dtype=np.int64).reshape(-1, 6)
+        data = data[np.argsort(data[:, 0], kind="stable")]
+        for i, (name, dtype) in enumerate(zip(self.COLUMNS, self.DTYPES)):
+            setattr(self, name, data[:, i].astype(dtype))
+
+    def position(self, enemy_id):
+        i = int(np.searchsorted(self.ids, enemy_id))
+        if i < len(self.ids) and self.ids[i] == enemy_id:
+            return i
+        return None
+
+    def row(self, enemy_id):
+        i = self.position(enemy_id)
+        if i is None:
+            raise KeyError(enemy_id)
+        return i
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter([self.view(enemy_id) for enemy_id in self.ids.tolist()])
+
+    def __getitem__(self, i):
+        return self.view(int(self.ids[i]))
+
+    def __contains__(self, enemy):
+        return self.position(enemy.id) is not None
+
+    def view(self, enemy_id):
+        if self.views is None:
+            self.views = {}
+        view = self.views.get(enemy_id)
+        if view is None:
+            view = EnemyView(self, enemy_id)
+            self.views[enemy_id] = view
+        return view
+
+    def extend(self, rows):
+        rows = list(rows)
+        if rows and len(self) and min(row[0] for row in rows) <= self.ids[-1]:
+            # Нові id зазвичай більші за наявні; інакше групу перебудовуємо з сортуванням
+            existing = zip(*(getattr(self, name).tolist() for name in self.COLUMNS))
+            self._set_columns(list(existing) + rows)
+            return
+        data = np.array([row[:6] for row in rows], dtype=np.int64).reshape(-1, 6)
+        data = data[np.argsort(data[:, 0], kind="stable")]
+        for i, (name, dtype) in enumerate(zip(self.COLUMNS, self.DTYPES)):
+            setattr(self, name, np.concatenate((getattr(self, name), data[:, i].astype(dtype))))
+
+    def remove(self, enemy_id):
+        i = self.position(enemy_id)
+        if i is None:
+            return False
+        view = self.views.pop(enemy_id, None) if self.views else None
+        if view is not None:
+            view.values = {name: int(getattr(self, name)[i]) for name in self.COLUMNS[1:]}
+            view.group = None
+        for name in self.COLUMNS:
+            setattr(self, name, np.delete(getattr(self, name), i))
+        return True
+
+    def overlapping(self, rect):
+        # Індекси ворогів, чий квадрат SIZE x SIZE перетинає rect
+        rect = pygame.Rect(rect)
+        hits = ((self.xs < rect.right) & (self.xs + self.SIZE > rect.left) &
+                (self.ys < rect.bottom) & (self.ys + self.SIZE > rect.top))
+        return np.flatnonzero(hits)
+
+    def first_overlap(self, rect):
+        hits = self.overlapping(rect)
+        if len(hits) == 0:
+            return None
+        return self.view(int(self.ids[hits[0]]))
+
+    def set_positions(self, positions):
+        # Нові позиції отримують перші len(positions) ворогів
+        if not positions:
+            return
+        placed = np.array(positions, dtype=np.int64).reshape(-1, 2)
+        self.xs[:len(placed)] = placed[:, 0]
+        self.ys[:len(placed)] = placed[:, 1]
+
+    def save_positions(self, count=None):
+        count = len(self) if count is None else count
+        if count == 0:
+            return
+        for row in zip(self.ids[:count].tolist(), self.xs[:count].tolist(), self.ys[:count].tolist()):
+            persistence.submit(("enemy", self.room_id, row[0]), "update_enemy_positions", [row])
+
+    def draw(self, screen, image):
+        # Один виклик Surface.blits для всіх ворогів; повертає змінені прямокутники
+        if len(self) == 0:
+            return []
+        return screen.blits(list(zip([image] * len(self), zip(self.xs.tolist(), self.ys.tolist()))))
 
 
 
 class Wall:
+    # Стіни входять у спільні WallLayout, тому їх не змінюють
+    __slots__ = ("rect",)
+
     def __init__(self, x, y, width, height):
         self.rect = pygame.Rect(x, y, width, height)
@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import OrderedDict
+from storage import get_backend
+
+# Методи сховища, виклики яких з різних записів можна злити в один (аргумент - список рядків)
+MERGEABLE = ("update_enemy_positions",)
+
+
+class PersistenceWorker:
+    # Запис у БД у фоновому потоці. Моделі ставлять команди в чергу з ключем сутності
+    # (("player", 1), ("room", 3), ("enemy", id кімнати, id ворога)); нова команда з тим самим ключем
+    # замінює ще не виконану. Черга обмежена maxsize різними сутностями - коли вона повна, submit чекає (backpressure).
+    # call() - читання і вставки, яким потрібен результат: виконуються після записів тих сутностей,
+    # яких стосуються (after), а без after - після всієї черги.
+    # Команда, що впала, повертається на початок черги і повторюється до max_retries разів
+    # з паузою retry_delay, що подвоюється; новіший запис тієї ж сутності її замінює.
+    # Остаточно втрачені записи рахуються в dropped, остання помилка - last_error (take_error)
+    def __init__(self, maxsize=1024, batch_size=64, max_retries=5, retry_delay=0.05):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.in_flight = 0
+        self.in_flight_keys = set()
+        self.thread = None
+        self.stopping = False
+        self.attempts = {}
+        self.last_error = None
+        self.error_pending = False
+
+        self.submitted = 0
+        self.coalesced = 0
+        self.executed = 0
+        self.batches = 0
+        self.failures = 0
+        self.retries = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.backpressure_waits = 0
+        self.blocked_ms = 0.0
+        self.batch_ms = 0.0
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.stopping = False
+            self.thread = threading.Thread(target=self.run, name="persistence", daemon=True)
+            self.thread.start()
+
+    def submit(self, key, method, *args):
+        with self.condition:
+            if key in self.pending:
+                # Сутність уже чекає на запис - достатньо найновішого стану
+                self.pending[key] = (method, args)
+                self.coalesced += 1
+                return
+            if len(self.pending) >= self.maxsize:
+                self.backpressure_waits += 1
+                wait_start = time.perf_counter()
+                self.condition.wait_for(lambda: len(self.pending) < self.maxsize)
+                self.blocked_ms += (time.perf_counter() - wait_start) * 1000
+            self.pending[key] = (method, args)
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, len(self.pending))
+            self.condition.notify_all()
+        self.start()
+
+    def call(self, method, *args, after=None):
+        # Синхронний виклик сховища. after - префікси ключів записів, які мають виконатись раніше:
+        # ("room", 5) - кімната 5, ("enemy", 5) - усі вороги кімнати 5; () - без очікування;
+        # None - після всіх записів, поставлених раніше
+        if after is None:
+            self.drain()
+        else:
+            self.wait_for(after)
+        return getattr(get_backend(), method)(*args)
+
+    def waiting_on(self, prefixes):
+        # Викликається під condition
+        return any(key[:len(prefix)] == prefix
+                   for keys in (self.pending, self.in_flight_keys) for key in keys for prefix in prefixes)
+
+    def wait_for(self, prefixes):
+        prefixes = tuple(prefixes)
+        if not prefixes:
+            return
+        with self.condition:
+            if not self.waiting_on(prefixes):
+                return
+        self.start()
+        with self.condition:
+            self.condition.wait_for(lambda: not self.waiting_on(prefixes))
+
+    def drain(self, timeout=None):
+        with self.condition:
+            if not self.pending and not self.in_flight:
+                return True
+        self.start()
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.in_flight, timeout)
+
+    def stop(self):
+        self.drain()
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.pending or self.stopping)
+                if not self.pending:
+                    return
+                batch = [self.pending.popitem(last=False) for _ in range(min(self.batch_size, len(self.pending)))]
+                self.in_flight = len(batch)
+                self.in_flight_keys = {key for key, _ in batch}
+                self.condition.notify_all()
+
+            batch_start = time.perf_counter()
+            failed = self.execute(batch)
+            with self.condition:
+                self.batch_ms = (time.perf_counter() - batch_start) * 1000
+                self.executed += len(batch) - len(failed)
+                self.batches += 1
+                retry = self.requeue(batch, failed)
+                self.in_flight = 0
+                self.in_flight_keys = set()
+                self.condition.notify_all()
+            if retry:
+                # Пауза перед повтором: тимчасова помилка БД (розрив з'єднання, блокування) встигає минути
+                time.sleep(self.retry_delay * 2 ** (retry - 1))
+
+    def execute(self, batch):
+        # Однакові об'єднувані команди пакета йдуть у сховище одним викликом.
+        # Повертає {ключ: помилка} для команд, що не виконались
+        backend = get_backend()
+        failed = {}
+        merged = {}
+        for key, (method, args) in batch:
+            if method in MERGEABLE:
+                keys, rows = merged.setdefault(method, ([], []))
+                keys.append(key)
+                rows.extend(args[0])
+                continue
+            error = self.apply(backend, method, args)
+            if error is not None:
+                failed[key] = error
+        for method, (keys, rows) in merged.items():
+            error = self.apply(backend, method, (rows,))
+            if error is not None:
+                failed.update(dict.fromkeys(keys, error))
+        return failed
+
+    def apply(self, backend, method, args):
+        try:
+            getattr(backend, method)(*args)
+        except Exception as e:
+            self.failures += 1
+            print(f"Помилка запису в БД ({method}): {e}")
+            return e
+        return None
+
+    def requeue(self, batch, failed):
+        # Викликається під condition; повертає найбільший номер повтору серед повернених у чергу команд
+        retry = 0
+        for key, (method, args) in reversed(batch):
+            if key not in failed:
+                self.attempts.pop(key, None)
+                continue
+            attempts = self.attempts.pop(key, 0) + 1
+            if key in self.pending:
+                # Поки команда виконувалась, надійшов новіший стан сутності - він і буде записаний
+                continue
+            if attempts > self.max_retries:
+                self.dropped += 1
+                self.last_error = f"{method}: {failed[key]}"
+                self.error_pending = True
+                continue
+            self.pending[key] = (method, args)
+            self.pending.move_to_end(key, last=False)
+            self.attempts[key] = attempts
+            self.retries += 1
+            retry = max(retry, attempts)
+        return retry
+
+    def take_error(self):
+        # Остання остаточно втрачена команда, про яку ще не повідомлено (None, якщо таких немає)
+        if not self.error_pending:
+            return None
+        with self.condition:
+            self.error_pending = False
+            return self.last_error
+
+    def depth(self):
+        return len(self.pending) + self.in_flight
+
+    def metrics(self):
+        with self.condition:
+            return {
+                "queue_depth": len(self.pending),
+                "in_flight": self.in_flight,
+                "max_queue_depth": self.max_depth,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "executed": self.executed,
+                "batches": self.batches,
+                "failures": self.failures,
+                "retries": self.retries,
+                "dropped": self.dropped,
+                "last_error": self.last_error,
+                "backpressure_waits": self.backpressure_waits,
+                "blocked_ms": self.blocked_ms,
+                "last_batch_ms": self.batch_ms,
+            }
+
+
+persistence = PersistenceWorker()
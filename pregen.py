@@ -0,0 +1,209 @@
+import random
+import threading
+from collections import deque
+import numpy as np
+from models import Room, room_cache
+from spawn import spawn_enemies
+
+# depth - на скільки переходів уперед від поточної кімнати будуються кімнати-заглушки;
+# max_rooms - скільки згенерованих наперед, але ще не відвіданих кімнат може існувати одночасно
+PREGEN_CONFIG = {
+    "depth": 1,
+    "max_rooms": 8
+}
+
+
+class RoomPregenerator:
+    # Будує сусідні кімнати-заглушки (-1) разом із зв'язками та ворогами, поки гравець досліджує
+    # поточну кімнату, тож перехід лише підставляє готову кімнату.
+    # background=False - без генерації наперед: кімната створюється при переході (відтворювані запуски з seed).
+    # Зміни зв'язків кімнат і вхід у кімнату виконуються під lock; запити до БД і генерація ворогів - без нього
+    def __init__(self, depth=None, max_rooms=None, background=True, seed=None):
+        self.depth = PREGEN_CONFIG["depth"] if depth is None else depth
+        self.max_rooms = PREGEN_CONFIG["max_rooms"] if max_rooms is None else max_rooms
+        self.background = background
+        self.rng = random.Random(seed)
+        self.lock = threading.RLock()
+        self.condition = threading.Condition()
+        self.stopped = threading.Event()
+        self.target = None
+        self.busy = False
+        self.thread = None
+        self.pregenerated = set()
+        self.building = {}
+        # Зростає при перезапуску гри: обхід, початий зі старих об'єктів кімнат, зупиняється
+        self.epoch = 0
+        self.generated = 0
+        self.used = 0
+
+    def schedule(self, room):
+        if not self.background or self.stopped.is_set():
+            return
+        with self.condition:
+            # Цікава лише остання кімната гравця: старий запит замінюється новим
+            self.target = (room, self.epoch)
+            self.condition.notify_all()
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name="room-pregen", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.target is not None or self.stopped.is_set())
+                if self.stopped.is_set():
+                    return
+                (room, epoch), self.target = self.target, None
+                self.busy = True
+            try:
+                self.expand(room, epoch)
+            except Exception as e:
+                print(f"Помилка попередньої генерації кімнат: {e}")
+            with self.condition:
+                self.busy = False
+                self.condition.notify_all()
+
+    def stop(self):
+        # Перед закриттям сховища: кімната, що вже будується, добудовується разом з ворогами,
+        # новий обхід не починається (зміна epoch зупиняє поточний)
+        with self.condition:
+            self.stopped.set()
+            self.target = None
+            self.condition.notify_all()
+        with self.lock:
+            self.epoch += 1
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def wait_idle(self, timeout=None):
+        with self.condition:
+            return self.condition.wait_for(lambda: self.target is None and not self.busy, timeout)
+
+    def horizon(self, room):
+        # id кімнат у межах depth переходів від room (лише за кімнатами з кешу, без запитів до БД)
+        ids, frontier = set(), [room]
+        for _ in range(self.depth):
+            next_frontier = []
+            for current in frontier:
+                for room_id in current.neighbour_ids():
+                    if room_id not in ids:
+                        ids.add(room_id)
+                        neighbour = room_cache.get_room(room_id)
+                        if neighbour is not None:
+                            next_frontier.append(neighbour)
+            frontier = next_frontier
+        return ids
+
+    def expand(self, room, epoch=None):
+        # Обхід у ширину від кімнати гравця до глибини depth
+        with self.lock:
+            if epoch is None:
+                epoch = self.epoch
+            # Кімнати, що лишились позаду, вже не рахуються в ліміт max_rooms
+            self.pregenerated &= self.horizon(room)
+        queue = deque([(room, 0)])
+        while queue:
+            current, level = queue.popleft()
+            if level >= self.depth:
+                continue
+            for direction in ('up', 'down', 'left', 'right'):
+                neighbour, event = None, None
+                with self.lock:
+                    if self.target is not None or self.epoch != epoch:
+                        return
+                    room_id = getattr(current, f"{direction}_room_id")
+                    if room_id is None:
+                        continue
+                    key = (current.id, direction)
+                    if key in self.building:
+                        # Цю кімнату вже будує гравець, що дійшов до виходу
+                        continue
+                    if room_id == -1:
+                        if len(self.pregenerated) >= self.max_rooms:
+                            return
+                        # Вихід зарезервовано: гравець, що дійде до нього, дочекається цієї кімнати
+                        event = self.building[key] = threading.Event()
+                    elif level + 1 < self.depth:
+                        neighbour = Room.load(room_id)
+                if event is not None:
+                    # Запити до БД виконуються без lock, тож гра не чекає на генерацію
+                    try:
+                        neighbour = self.build(current, direction, epoch)
+                    finally:
+                        with self.lock:
+                            del self.building[key]
+                        event.set()
+                if neighbour is not None:
+                    queue.append((neighbour, level + 1))
+
+    def create(self, prev_room, direction):
+        new_room = Room.create(prev_room=prev_room, from_direction=direction, rng=self.rng)
+        spawn_enemies(new_room, avoid=new_room.entry_position(direction),
+                      rng=np.random.default_rng(self.rng.getrandbits(64)))
+        return new_room
+
+    def build(self, prev_room, direction, epoch):
+        new_room = self.create(prev_room, direction)
+        with self.lock:
+            if self.link(prev_room, direction, new_room, epoch):
+                self.pregenerated.add(new_room.id)
+                self.generated += 1
+        return new_room
+
+    def link(self, prev_room, direction, new_room, epoch):
+        # Викликається під lock, коли кімнату вже побудовано без нього
+        if self.epoch == epoch:
+            # Зв'язок у БД уже записав insert_room; збереження prev_room, поставлене в чергу
+            # під час генерації, могло нести старе -1, тому кімната зберігається ще раз (і потрапляє в кеш).
+            # Після перезапуску prev_room застарів, і записувати його в кеш не можна
+            setattr(prev_room, f"{direction}_room_id", new_room.id)
+            prev_room.save()
+            return True
+        # Після перезапуску в кеші вже інший об'єкт цієї кімнати
+        cached = room_cache.get_room(prev_room.id)
+        if cached is not None and getattr(cached, f"{direction}_room_id") == -1:
+            setattr(cached, f"{direction}_room_id", new_room.id)
+        return False
+
+    def room_towards(self, room, direction):
+        # id сусідньої кімнати; якщо її ще не встигли згенерувати - створюється зараз.
+        # Кімната з ворогами будується без lock, тож тік сервера на неї не чекає; вихід резервується
+        # так само, як у expand. Не можна викликати під lock: тут можливе очікування іншої генерації
+        key = (room.id, direction)
+        while True:
+            with self.lock:
+                event = self.building.get(key)
+                if event is None:
+                    room_id = getattr(room, f"{direction}_room_id")
+                    if room_id not in (None, -1):
+                        if room_id in self.pregenerated:
+                            self.used += 1
+                        self.pregenerated.discard(room_id)
+                        return room_id
+                    event = self.building[key] = threading.Event()
+                    epoch = self.epoch
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                event.wait()
+                continue
+            try:
+                new_room = self.create(room, direction)
+                # Зв'язок ставиться до зняття резерву, інакше фоновий обхід побачив би -1 і збудував другу кімнату
+                with self.lock:
+                    linked = self.link(room, direction, new_room, epoch)
+            finally:
+                with self.lock:
+                    del self.building[key]
+                event.set()
+            if linked:
+                return new_room.id
+            # Об'єкт room застарів: вихід перевіряється ще раз на актуальній кімнаті
+            room = room_cache.get_room(room.id) or Room.load(room.id)
+
+    def reset(self):
+        with self.lock:
+            self.pregenerated.clear()
+            self.epoch += 1
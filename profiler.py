@@ -0,0 +1,172 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from storage import get_backend
+
+
+class FrameProfiler:
+    # Вимірює час кожної фази кадру та кількість звернень до БД за кадр.
+    # Зберігає останні history кадрів (ковзне вікно), з якого будуються гістограма і перцентилі
+    PHASES = ("events", "timers", "handle_collisions", "update_room", "move_player",
+              "draw_room", "flip")
+
+    def __init__(self, history=600, enabled=True):
+        self.enabled = enabled
+        self.frames = deque(maxlen=history)
+        self.current = None
+        self.frame_start = None
+        self.statements_start = 0
+
+    def begin_frame(self):
+        if not self.enabled:
+            return
+        self.current = dict.fromkeys(self.PHASES, 0.0)
+        self.statements_start = get_backend().statements
+        self.frame_start = time.perf_counter()
+
+    @contextmanager
+    def phase(self, name):
+        if self.current is None:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[name] = self.current.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def end_frame(self):
+        if self.current is None:
+            return
+        self.frames.append({
+            "frame_ms": (time.perf_counter() - self.frame_start) * 1000,
+            "db_statements": get_backend().statements - self.statements_start,
+            "phases": self.current
+        })
+        self.current = None
+
+    def frame_times(self):
+        return sorted(frame["frame_ms"] for frame in self.frames)
+
+    def percentile(self, fraction):
+        times = self.frame_times()
+        if not times:
+            return 0.0
+        return times[min(len(times) - 1, int(len(times) * fraction))]
+
+    def fps(self):
+        if not self.frames:
+            return 0.0
+        mean = sum(frame["frame_ms"] for frame in self.frames) / len(self.frames)
+        return 1000 / mean if mean > 0 else 0.0
+
+    def worst_phase(self):
+        # Фаза з найбільшим сумарним часом у вікні
+        if not self.frames:
+            return None, 0.0
+        totals = dict.fromkeys(self.PHASES, 0.0)
+        for frame in self.frames:
+            for name, ms in frame["phases"].items():
+                totals[name] = totals.get(name, 0.0) + ms
+        name = max(totals, key=totals.get)
+        return name, totals[name] / len(self.frames)
+
+    def db_statements_per_frame(self):
+        if not self.frames:
+            return 0.0
+        return sum(frame["db_statements"] for frame in self.frames) / len(self.frames)
+
+    def histogram(self, bucket_ms=2.0, buckets=20):
+        # Остання корзина збирає всі кадри, довші за bucket_ms * (buckets - 1)
+        counts = [0] * buckets
+        for frame in self.frames:
+            counts[min(buckets - 1, int(frame["frame_ms"] // bucket_ms))] += 1
+        return counts
+
+    def summary(self):
+        worst_name, worst_ms = self.worst_phase()
+        return {
+            "frames": len(self.frames),
+            "fps": self.fps(),
+            "p50_ms": self.percentile(0.50),
+            "p99_ms": self.percentile(0.99),
+            "worst_phase": worst_name,
+            "worst_phase_ms": worst_ms,
+            "db_statements_per_frame": self.db_statements_per_frame(),
+            "histogram_2ms": self.histogram()
+        }
+
+    def export(self, path):
+        # .csv - по рядку на кадр; інакше JSON з підсумком і всіма кадрами
+        if path.endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(("frame_ms", "db_statements") + self.PHASES)
+                for frame in self.frames:
+                    writer.writerow((frame["frame_ms"], frame["db_statements"]) +
+                                    tuple(frame["phases"].get(name, 0.0) for name in self.PHASES))
+        else:
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(), "frames": list(self.frames)}, f, indent=2)
+
+
+class StartupProfiler:
+    # Час кожного кроку запуску гри. Кроки у фонових потоках (background) вимірюються окремо,
+    # а очікування на них у головному потоці - як фаза "<назва>_wait"
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.phases = {}
+        self.total_ms = None
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def background(self, name, target):
+        return BackgroundStep(self, name, target)
+
+    def finish(self):
+        self.total_ms = (time.perf_counter() - self.start) * 1000
+
+    def summary(self):
+        return {"total_ms": self.total_ms, "phases": dict(self.phases)}
+
+    def report(self):
+        lines = [f"Запуск: {self.total_ms or 0.0:.1f} ms"]
+        for name, ms in self.phases.items():
+            lines.append(f"  {name:16} {ms:8.1f} ms")
+        return "\n".join(lines)
+
+
+class BackgroundStep:
+    # Крок запуску у фоновому потоці; wait() повертає результат або передає виняток потоку
+    def __init__(self, profiler, name, target):
+        self.profiler = profiler
+        self.name = name
+        self.target = target
+        self.result = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name=f"startup-{name}", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            with self.profiler.phase(self.name):
+                self.result = self.target()
+        except BaseException as e:
+            self.error = e
+
+    def wait(self):
+        with self.profiler.phase(f"{self.name}_wait"):
+            self.thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.result
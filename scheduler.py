@@ -0,0 +1,73 @@
+import heapq
+import itertools
+
+
+class Timer:
+    def __init__(self, due, priority, callback, args, interval=None):
+        self.due = due
+        self.priority = priority
+        self.callback = callback
+        self.args = args
+        self.interval = interval
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    # Таймери гри в купі за часом спрацювання: за кадр перевіряється лише вершина купи,
+    # тож кадр без подій коштує O(1) незалежно від кількості таймерів.
+    # Час береться з clock.now(), тому працює і з RealClock, і з SimulatedClock
+    def __init__(self, clock):
+        self.clock = clock
+        self.queue = []
+        self.counter = itertools.count()
+        self.fired = 0
+
+    def now(self):
+        return self.clock.now()
+
+    def _push(self, timer):
+        # При однаковому часі першим спрацьовує таймер з меншим priority, далі - за порядком додавання
+        heapq.heappush(self.queue, (timer.due, timer.priority, next(self.counter), timer))
+        return timer
+
+    def call_at(self, due, callback, *args, priority=0):
+        return self._push(Timer(due, priority, callback, args))
+
+    def call_later(self, delay, callback, *args, priority=0):
+        return self.call_at(self.now() + delay, callback, *args, priority=priority)
+
+    def call_every(self, interval, callback, *args, priority=0):
+        return self._push(Timer(self.now() + interval, priority, callback, args, interval))
+
+    def run_due(self, now=None):
+        if now is None:
+            now = self.now()
+        fired = 0
+        while self.queue and self.queue[0][0] <= now:
+            timer = heapq.heappop(self.queue)[3]
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                # Повторний таймер тримає рівний інтервал; після довгої паузи не надолужує пропущені спрацювання
+                timer.due += timer.interval
+                if timer.due <= now:
+                    timer.due = now + timer.interval
+                self._push(timer)
+            timer.callback(*timer.args)
+            fired += 1
+        self.fired += fired
+        return fired
+
+    def next_due(self):
+        while self.queue and self.queue[0][3].cancelled:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+    def clear(self):
+        self.queue.clear()
+
+    def __len__(self):
+        return sum(1 for entry in self.queue if not entry[3].cancelled)
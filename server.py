@@ -0,0 +1,538 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Усі зайняті кімнати мають поміщатися в кеш кімнат, щоб гравці однієї кімнати бачили
+# ту саму групу ворогів; розмір задається до імпорту models, який створює кеш
+os.environ.setdefault("RPG_ROOM_CACHE_SIZE", "4096")
+
+from storage import get_backend
+from persistence import persistence
+from models import Room, Player, Enemy, PlayerWriteBehind
+from battle import Battle
+from game import Game
+from pregen import RoomPregenerator
+from scheduler import Scheduler
+from simulation import SimulatedClock
+from spawn import spawn_enemies
+
+# tick_ms - фіксований крок симуляції; snapshot_every - стан клієнтам кожен N-й тік;
+# db_workers - потоки для запитів до БД (пул з'єднань розширюється під них);
+# max_write_buffer - байти, що чекають на відправку клієнту, після яких стани йому пропускаються
+SERVER_CONFIG = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    "tick_ms": 50,
+    "snapshot_every": 1,
+    "db_workers": 4,
+    "max_sessions": 1000,
+    "max_write_buffer": 256 * 1024,
+    "report_every_s": 10
+}
+RESPAWN_DELAY = 3000
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class RemoteInput:
+    # Останній напрямок руху від клієнта діє, доки клієнт не надішле новий
+    def __init__(self):
+        self.move = (0, 0)
+
+    def set(self, dx, dy):
+        self.move = (max(-1, min(1, int(dx))), max(-1, min(1, int(dy))))
+
+    def next_movement(self):
+        return self.move
+
+
+class SharedBattle(Battle):
+    # Вороги кімнати спільні для всіх її гравців: якщо ворога вже переміг інший гравець,
+    # битва завершується без нагороди
+    def enemy_lost(self):
+        if self.enemy.group is not None:
+            return False
+        self.finish()
+        self.game.add_message("Ворога переміг інший гравець.")
+        self.game.current_battle = None
+        self.game.game_state = 'exploration'
+        return True
+
+    def player_attack(self):
+        if not self.enemy_lost():
+            super().player_attack()
+
+    def enemy_attack(self):
+        if not self.enemy_lost():
+            super().enemy_attack()
+
+    def skip(self):
+        if not self.enemy_lost():
+            return super().skip()
+
+
+class SessionEndGame:
+    # Поразка і завершення гри для однієї сесії: перезапуск скидає лише цього гравця
+    def __init__(self, session):
+        self.session = session
+        self.restart_timer = None
+
+    def game_over(self):
+        if self.restart_timer is not None:
+            return
+        self.session.add_message("Гра закінчена! Ви зазнали поразки.")
+        self.session.add_message("Ваші характеристики скинуто до початкових значень.")
+        self.restart_timer = self.session.scheduler.call_later(RESPAWN_DELAY, self.restart)
+
+    def restart(self):
+        self.restart_timer = None
+        self.session.server.run_blocking(self.session, self.session.restart_game)
+
+    def end_game(self):
+        self.session.add_message("Вітаємо! Ви досягли 100-го рівня та завершили гру!")
+        self.session.player_store.flush(force=True)
+        self.session.game_state = 'finished'
+
+    def cancel(self):
+        if self.restart_timer is not None:
+            self.restart_timer.cancel()
+            self.restart_timer = None
+
+
+class Session(Game):
+    # Гравець на сервері: логіка Game (рух, зіткнення, переходи, битви, рівні) без вікна,
+    # з часом і планувальником сервера та вводом від клієнта. Game.__init__ не викликається -
+    # він відкриває вікно і завантажує гравця 1.
+    # Запити до БД виконуються в потоках сервера (run_blocking); поки запит триває, busy = True
+    # і тік сесію пропускає
+    battle_class = SharedBattle
+
+    def __init__(self, server, player_id, name, writer):
+        self.server = server
+        self.player_id = player_id
+        self.name = name
+        self.writer = writer
+        self.headless = True
+        self.input_source = RemoteInput()
+        self.time = server.time
+        self.scheduler = server.scheduler
+        self.pregen = server.pregen
+        self.WIDTH, self.HEIGHT = 800, 600
+        self.player = None
+        self.player_store = None
+        self.current_room = None
+        self.enemies = None
+        self.messages = []
+        self.message_duration = 3000
+        self.message_timer = None
+        self.game_state = 'loading'
+        self.current_battle = None
+        self.transitioning = False
+        self.transition_direction = None
+        self.end_game_handler = SessionEndGame(self)
+        self.busy = False
+        self.skip_requested = False
+        self.pings = []
+        self.dropped_states = 0
+
+    def load(self):
+        player = Player.load(self.name, player_id=self.player_id)
+        if not player.name:
+            player.name = self.name
+        room = Room.load(player.current_room_id) or Room.load(1)
+        # Кімната і вороги потрапляють у кеш до lock, який тримає тік сервера
+        Enemy.load_all(room.id)
+        with self.pregen.lock:
+            self.player = player
+            self.player_store = PlayerWriteBehind(player, clock=self.time)
+            self.current_room = room
+            player.current_room_id = room.id
+            self.set_enemies(Enemy.load_all(room.id))
+            self.game_state = 'exploration'
+        Room.prefetch_neighbours(room)
+
+    def change_room(self, direction):
+        # Кімната в цьому напрямку, її вороги та сусіди завантажуються до move_to_room,
+        # тож під lock вони вже беруться з кешу
+        try:
+            room = Room.load(self.pregen.room_towards(self.current_room, direction))
+            # Невідвідана кімната без ворогів заселяється тут, а не в move_to_room під lock,
+            # щоб тіки інших сесій не чекали на запис ворогів
+            if not room.visited and len(Enemy.load_all(room.id)) == 0:
+                spawn_enemies(room, avoid=room.entry_position(direction))
+            Room.prefetch_neighbours(room)
+            self.move_to_room(direction)
+        finally:
+            self.transitioning = False
+
+    def restart_game(self):
+        # На відміну від Game, світ спільний з іншими гравцями і не скидається
+        self.reset_player()
+        room = Room.load(self.player.current_room_id)
+        Enemy.load_all(room.id)
+        with self.pregen.lock:
+            self.current_room = room
+            self.WIDTH, self.HEIGHT = room.width, room.height
+            self.set_enemies(Enemy.load_all(room.id))
+            self.messages.clear()
+            self.game_state = 'exploration'
+            self.current_battle = None
+
+    def center_enemies(self):
+        # Вороги кімнати, де вже є інші гравці, не переставляються в них перед очима
+        room_id = self.current_room.id
+        if any(other is not self and other.current_room is not None and other.current_room.id == room_id
+               for other in list(self.server.sessions.values())):
+            return
+        super().center_enemies()
+
+    def step(self):
+        # Один тік сесії, як Game.update; викликається під pregen.lock
+        if self.busy or self.game_state in ('loading', 'finished'):
+            return
+        if self.skip_requested:
+            self.skip_requested = False
+            if self.current_battle:
+                self.current_battle.skip()
+        if self.game_state == 'exploration':
+            self.handle_collisions()
+            if self.transitioning:
+                if self.transition_direction:
+                    direction, self.transition_direction = self.transition_direction, None
+                    self.server.run_blocking(self, self.change_room, direction)
+                return
+            dx, dy = self.get_movement()
+            self.move_player(dx, dy)
+        elif self.game_state == 'game_over':
+            self.end_game_handler.game_over()
+        self.player_store.maybe_flush()
+
+    def state(self, tick):
+        player = self.player
+        battle = None
+        if self.current_battle is not None:
+            enemy = self.current_battle.enemy
+            battle = {"enemy": enemy.id, "enemy_health": max(enemy.health, 0)}
+        return {
+            "type": "state",
+            "tick": tick,
+            "state": self.game_state,
+            "room": self.current_room.id,
+            "x": player.x,
+            "y": player.y,
+            "health": player.health,
+            "max_health": player.max_health,
+            "attack": player.attack,
+            "defense": player.defense,
+            "experience": player.experience,
+            "level": player.level,
+            "battle": battle,
+            "messages": [text for text, _ in self.messages]
+        }
+
+    def send(self, message):
+        self.send_line(json.dumps(message, ensure_ascii=False))
+
+    def send_line(self, line):
+        # Без очікування drain: повільному клієнту нові стани не надсилаються, доки буфер не спорожніє
+        if self.writer.is_closing():
+            return
+        if self.writer.transport.get_write_buffer_size() > self.server.max_write_buffer:
+            self.dropped_states += 1
+            return
+        self.writer.write((line + "\n").encode("utf-8"))
+
+    def close(self):
+        if self.current_battle is not None:
+            self.current_battle.finish()
+            self.current_battle = None
+        if self.message_timer is not None:
+            self.message_timer.cancel()
+            self.message_timer = None
+        self.end_game_handler.cancel()
+        if self.player_store is not None:
+            self.player_store.flush(force=True)
+
+
+class GameServer:
+    # Багато сесій гравців в одному процесі: asyncio приймає з'єднання і щотіку (fixed tick)
+    # просуває час, таймери та всі сесії, після чого розсилає стани.
+    # Протокол - рядки JSON через TCP: клієнт надсилає hello, input, skip, ping, bye;
+    # сервер - welcome, state, pong, stats, error
+    def __init__(self, host=None, port=None, tick_ms=None, snapshot_every=None, db_workers=None,
+                 max_sessions=None, seed=None):
+        self.host = SERVER_CONFIG["host"] if host is None else host
+        self.port = SERVER_CONFIG["port"] if port is None else port
+        self.tick_ms = tick_ms or SERVER_CONFIG["tick_ms"]
+        self.snapshot_every = snapshot_every or SERVER_CONFIG["snapshot_every"]
+        self.max_sessions = max_sessions or SERVER_CONFIG["max_sessions"]
+        self.max_write_buffer = SERVER_CONFIG["max_write_buffer"]
+        self.time = SimulatedClock(self.tick_ms)
+        self.scheduler = Scheduler(self.time)
+        self.rng = random.Random(seed)
+        self.pregen = RoomPregenerator(seed=self.rng.getrandbits(64))
+        self.db_workers = db_workers or SERVER_CONFIG["db_workers"]
+        self.db_executor = ThreadPoolExecutor(max_workers=self.db_workers, thread_name_prefix="db")
+        self.sessions = {}
+        self.loop = None
+        self.running = False
+        self.tick_count = 0
+        self.tick_times = deque(maxlen=1200)
+        self.overruns = 0
+        # db_errors - помилки сховища, session_errors - решта винятків у сесіях
+        self.db_errors = 0
+        self.session_errors = 0
+
+    def run_blocking(self, session, func, *args):
+        session.busy = True
+        future = self.loop.run_in_executor(self.db_executor, func, *args)
+        future.add_done_callback(lambda done: self.blocking_done(session, done))
+
+    def blocking_done(self, session, future):
+        session.busy = False
+        error = future.exception()
+        if error is not None:
+            self.count_error(error)
+            print(f"Помилка запиту сесії {session.player_id}: {error}")
+
+    def count_error(self, error):
+        if isinstance(error, get_backend().errors):
+            self.db_errors += 1
+        else:
+            self.session_errors += 1
+
+    def tick(self):
+        self.tick_count += 1
+        self.time.advance()
+        outgoing = []
+        with self.pregen.lock:
+            self.scheduler.run_due()
+            for session in list(self.sessions.values()):
+                session.step()
+            if self.tick_count % self.snapshot_every == 0:
+                outgoing = self.build_states()
+        error = persistence.take_error()
+        if error:
+            print(f"Зміни не збережено після повторів: {error}")
+        for session, line in outgoing:
+            session.send_line(line)
+        for session in self.sessions.values():
+            for sent in session.pings:
+                session.send({"type": "pong", "t": sent, "tick": self.tick_count})
+            session.pings.clear()
+
+    def build_states(self):
+        # Вороги та гравці кімнати кодуються в JSON один раз для всіх її гравців і дописуються
+        # в кінець стану кожного: у людній кімнаті це більша частина повідомлення
+        rooms = {}
+        for session in self.sessions.values():
+            if session.game_state != 'loading' and not session.busy:
+                rooms.setdefault(session.current_room.id, []).append(session)
+        outgoing = []
+        for members in rooms.values():
+            group = members[0].enemies
+            enemies = [list(row) for row in zip(group.ids.tolist(), group.xs.tolist(),
+                                                group.ys.tolist(), group.health.tolist())]
+            players = [[s.player.id, s.player.name, s.player.x, s.player.y] for s in members]
+            shared = json.dumps({"enemies": enemies, "players": players}, ensure_ascii=False)[1:]
+            for session in members:
+                own = json.dumps(session.state(self.tick_count), ensure_ascii=False)
+                outgoing.append((session, own[:-1] + ", " + shared))
+        return outgoing
+
+    async def tick_loop(self, duration=None):
+        interval = self.tick_ms / 1000
+        report_every = max(1, SERVER_CONFIG["report_every_s"] * 1000 // self.tick_ms)
+        next_tick = self.loop.time()
+        end = None if duration is None else next_tick + duration
+        while self.running and (end is None or self.loop.time() < end):
+            start = time.perf_counter()
+            self.tick()
+            self.tick_times.append((time.perf_counter() - start) * 1000)
+            if self.tick_count % report_every == 0:
+                self.report()
+            next_tick += interval
+            delay = next_tick - self.loop.time()
+            if delay < 0:
+                # Тік довший за інтервал: наступний починається одразу, пропущені не надолужуються
+                self.overruns += 1
+                next_tick = self.loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def metrics(self):
+        return {
+            "sessions": len(self.sessions),
+            "ticks": self.tick_count,
+            "tick_interval_ms": self.tick_ms,
+            "tick_p50_ms": percentile(self.tick_times, 0.50),
+            "tick_p99_ms": percentile(self.tick_times, 0.99),
+            "tick_max_ms": max(self.tick_times, default=0.0),
+            "overruns": self.overruns,
+            "dropped_states": sum(session.dropped_states for session in self.sessions.values()),
+            "db_errors": self.db_errors,
+            "session_errors": self.session_errors,
+            "persistence_queue": persistence.depth(),
+        }
+
+    def report(self):
+        m = self.metrics()
+        print(f"Сесій: {m['sessions']}  тік p50 {m['tick_p50_ms']:.2f} ms  p99 {m['tick_p99_ms']:.2f} ms  "
+              f"перевищень: {m['overruns']}  черга запису: {m['persistence_queue']}")
+
+    async def read_message(self, reader):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            message = json.loads(line)
+        except ValueError:
+            return {"type": "invalid"}
+        return message if isinstance(message, dict) else {"type": "invalid"}
+
+    async def handle_client(self, reader, writer):
+        session = None
+        try:
+            message = await self.read_message(reader)
+            if message is None:
+                return
+            if message.get("type") == "stats":
+                # Запит показників без створення сесії (для loadgen і моніторингу)
+                writer.write((json.dumps({"type": "stats", **self.metrics()}) + "\n").encode("utf-8"))
+                await writer.drain()
+                return
+            error = self.check_hello(message)
+            if error:
+                writer.write((json.dumps({"type": "error", "error": error}, ensure_ascii=False) + "\n").encode("utf-8"))
+                await writer.drain()
+                return
+            player_id = int(message["player_id"])
+            name = str(message.get("name") or f"Гравець {player_id}")[:50]
+            session = Session(self, player_id, name, writer)
+            self.sessions[player_id] = session
+            session.busy = True
+            await self.loop.run_in_executor(self.db_executor, session.load)
+            session.busy = False
+            session.send({"type": "welcome", "player_id": player_id, "tick_ms": self.tick_ms})
+            while True:
+                message = await self.read_message(reader)
+                if message is None or message.get("type") == "bye":
+                    break
+                self.handle_message(session, message)
+        except (ConnectionError, ValueError) as e:
+            # ValueError - задовгий рядок від клієнта
+            print(f"З'єднання закрито: {e}")
+        except Exception as e:
+            self.count_error(e)
+            print(f"Помилка сесії: {e}")
+        finally:
+            if session is not None and self.sessions.get(session.player_id) is session:
+                del self.sessions[session.player_id]
+                with self.pregen.lock:
+                    session.close()
+            writer.close()
+
+    def check_hello(self, message):
+        if message.get("type") != "hello":
+            return "Спершу потрібне повідомлення hello"
+        try:
+            player_id = int(message.get("player_id"))
+        except (TypeError, ValueError):
+            return "Некоректний player_id"
+        if player_id < 1:
+            return "Некоректний player_id"
+        if player_id in self.sessions:
+            return f"Гравець {player_id} уже в грі"
+        if len(self.sessions) >= self.max_sessions:
+            return "Сервер заповнений"
+        return None
+
+    def handle_message(self, session, message):
+        # Стан гри змінюється лише в тіку: тут ввід тільки запам'ятовується
+        kind = message.get("type")
+        if kind == "input":
+            try:
+                session.input_source.set(message.get("dx", 0), message.get("dy", 0))
+            except (TypeError, ValueError):
+                session.send({"type": "error", "error": "Некоректний ввід"})
+        elif kind == "skip":
+            session.skip_requested = True
+        elif kind == "ping":
+            session.pings.append(message.get("t"))
+        elif kind == "stats":
+            session.send({"type": "stats", **self.metrics()})
+        else:
+            session.send({"type": "error", "error": f"Невідоме повідомлення: {kind}"})
+
+    async def serve(self, duration=None):
+        self.loop = asyncio.get_running_loop()
+        backend = get_backend()
+        if backend.name == "postgres":
+            # Потоки запитів сесій, запис у фоні та генерація кімнат - кожному своє з'єднання
+            backend.database.configure_pool(self.db_workers + 2)
+        await self.loop.run_in_executor(self.db_executor, backend.initialize)
+        server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        print(f"Сервер гри: {self.host}:{self.port}, тік {self.tick_ms} ms")
+        self.running = True
+        try:
+            await self.tick_loop(duration)
+        finally:
+            self.running = False
+            server.close()
+            await server.wait_closed()
+            await self.shutdown()
+
+    async def shutdown(self):
+        # Фонова генерація кімнат пише в сховище, тож зупиняється до збереження сесій і закриття сховища
+        await self.loop.run_in_executor(self.db_executor, self.pregen.stop)
+        with self.pregen.lock:
+            for session in list(self.sessions.values()):
+                session.close()
+                session.writer.close()
+            self.sessions.clear()
+        # Перед закриттям сховища дописуємо всю чергу
+        await self.loop.run_in_executor(self.db_executor, persistence.stop)
+        self.db_executor.shutdown(wait=True)
+        get_backend().close()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сервер гри для багатьох гравців")
+    parser.add_argument("--host", default=SERVER_CONFIG["host"])
+    parser.add_argument("--port", type=int, default=SERVER_CONFIG["port"])
+    parser.add_argument("--tick-ms", type=int, default=SERVER_CONFIG["tick_ms"])
+    parser.add_argument("--snapshot-every", type=int, default=SERVER_CONFIG["snapshot_every"],
+                        help="надсилати стан кожен N-й тік")
+    parser.add_argument("--db-workers", type=int, default=SERVER_CONFIG["db_workers"])
+    parser.add_argument("--duration", type=float, default=None, help="зупинитися через стільки секунд")
+    parser.add_argument("--seed", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    server = GameServer(args.host, args.port, args.tick_ms, args.snapshot_every, args.db_workers, seed=args.seed)
+    try:
+        asyncio.run(server.serve(args.duration))
+    except KeyboardInterrupt:
+        pass
+    m = server.metrics()
+    print(f"Тіків: {m['ticks']}, p50 {m['tick_p50_ms']:.2f} ms, p99 {m['tick_p99_ms']:.2f} ms, "
+          f"перевищень: {m['overruns']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
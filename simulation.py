@@ -0,0 +1,66 @@
+import random
+import pygame
+
+
+class RealClock:
+    # Реальний час гри: мілісекунди від pygame.init() і обмеження FPS
+    def __init__(self, clock, fps=60):
+        self.clock = clock
+        self.fps = fps
+
+    def now(self):
+        return pygame.time.get_ticks()
+
+    def advance(self):
+        self.clock.tick(self.fps)
+
+
+class SimulatedClock:
+    # Змодельований час: кожен кадр просуває час рівно на timestep мс без очікування
+    def __init__(self, timestep=16, start=0):
+        self.timestep = timestep
+        self.time = start
+
+    def now(self):
+        return self.time
+
+    def advance(self, ms=None):
+        self.time += self.timestep if ms is None else ms
+
+
+class ScriptedInput:
+    # Заздалегідь записаний рух: список (dx, dy) на кожен кадр; після кінця - стоїмо на місці
+    def __init__(self, moves, loop=False):
+        self.moves = list(moves)
+        self.loop = loop
+        self.index = 0
+
+    def next_movement(self):
+        if not self.moves:
+            return 0, 0
+        if self.index >= len(self.moves):
+            if not self.loop:
+                return 0, 0
+            self.index = 0
+        move = self.moves[self.index]
+        self.index += 1
+        return move
+
+
+class RandomWalkInput:
+    # Випадкове блукання з власним генератором: однаковий seed - однаковий маршрут
+    DIRECTIONS = [(-1, 0), (1, 0), (0, -1), (0, 1), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+    def __init__(self, seed=None, min_steps=10, max_steps=60):
+        self.rng = random.Random(seed)
+        self.min_steps = min_steps
+        self.max_steps = max_steps
+        self.move = (0, 0)
+        self.steps_left = 0
+
+    def next_movement(self):
+        if self.steps_left <= 0:
+            self.move = self.rng.choice(self.DIRECTIONS)
+            self.steps_left = self.rng.randint(self.min_steps, self.max_steps)
+        self.steps_left -= 1
+        return self.move
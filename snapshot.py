@@ -0,0 +1,251 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from storage import get_backend, ROOM_COLUMNS, ENEMY_COLUMNS
+from persistence import persistence
+
+# Формат файлу знімка світу (усі числа little-endian):
+#   заголовок HEADER;
+#   індекс кімнат - відсортовані id (int32), i-й id відповідає i-му запису кімнати;
+#   записи кімнат ROOM_RECORD;
+#   записи ворогів ENEMY_RECORD, згруповані за кімнатою (запис кімнати зберігає перший рядок і кількість);
+#   записи гравців PLAYER_RECORD.
+# Записи мають фіксований розмір, тож файл відкривається через mmap і кімната читається
+# за її id без розбору решти файлу
+MAGIC = b"RPGSNAP\0"
+VERSION = 1
+HEADER = struct.Struct("<8sII4I4Q")
+ROOM_RECORD = struct.Struct("<9i?3x2I")
+ENEMY_RECORD = struct.Struct("<7i")
+PLAYER_NAME_SIZE = 200
+PLAYER_RECORD = struct.Struct(f"<10i{PLAYER_NAME_SIZE}s")
+PLAYER_FIELDS = ("id", "x", "y", "current_room_id", "health", "max_health",
+                 "attack", "defense", "experience", "level")
+LINK_COLUMNS = ("up_room_id", "down_room_id", "left_room_id", "right_room_id")
+# id кімнат починаються з 1, тож 0 у записі означає відсутній вихід (None);
+# -1 (вихід є, кімната ще не згенерована) зберігається як є
+NO_LINK = 0
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _link_to_record(value):
+    return NO_LINK if value is None else value
+
+
+def _link_from_record(value):
+    return None if value == NO_LINK else value
+
+
+def write_snapshot(path, world):
+    rooms = sorted(world["rooms"], key=lambda room: room["id"])
+    players = sorted(world["players"], key=lambda player: player["id"])
+    room_ids = [room["id"] for room in rooms]
+    # Вороги йдуть блоками за порядком кімнат; вороги без кімнати в знімок не потрапляють
+    position = {room_id: i for i, room_id in enumerate(room_ids)}
+    enemies = sorted((tuple(row) for row in world["enemies"] if row[6] in position),
+                     key=lambda row: (position[row[6]], row[0]))
+    blocks = {}
+    for i, row in enumerate(enemies):
+        start, count = blocks.get(row[6], (i, 0))
+        blocks[row[6]] = (start, count + 1)
+
+    index_offset = HEADER.size
+    room_offset = index_offset + 4 * len(rooms)
+    enemy_offset = room_offset + ROOM_RECORD.size * len(rooms)
+    player_offset = enemy_offset + ENEMY_RECORD.size * len(enemies)
+
+    # Запис у тимчасовий файл і заміна: обірваний експорт не псує попередній знімок
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(rooms), len(enemies), len(players), 0,
+                            index_offset, room_offset, enemy_offset, player_offset))
+        f.write(np.asarray(room_ids, dtype="<i4").tobytes())
+        for room in rooms:
+            start, count = blocks.get(room["id"], (0, 0))
+            f.write(ROOM_RECORD.pack(room["id"], room["x"], room["y"], room["width"], room["height"],
+                                     *(_link_to_record(room[column]) for column in LINK_COLUMNS),
+                                     bool(room["visited"]), start, count))
+        for row in enemies:
+            f.write(ENEMY_RECORD.pack(*row))
+        for player in players:
+            name = (player["name"] or "").encode("utf-8")
+            if len(name) > PLAYER_NAME_SIZE:
+                raise SnapshotError(f"Ім'я гравця {player['id']} задовге для знімка")
+            f.write(PLAYER_RECORD.pack(*(player[field] for field in PLAYER_FIELDS), name))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return {"rooms": len(rooms), "enemies": len(enemies), "players": len(players)}
+
+
+class SnapshotReader:
+    # Читання знімка через mmap: відкриття читає лише заголовок, кімната з ворогами
+    # знаходиться бінарним пошуком в індексі id і розбирається тільки при зверненні
+    def __init__(self, path):
+        self.path = path
+        self.map = None
+        self.room_ids = None
+        self.file = open(path, "rb")
+        try:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise SnapshotError(f"Порожній файл знімка: {path}")
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise SnapshotError(f"Пошкоджений знімок: {path}")
+        (magic, version, _, self.room_count, self.enemy_count, self.player_count, _,
+         self.index_offset, self.room_offset, self.enemy_offset, self.player_offset) = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            self.close()
+            raise SnapshotError(f"Файл не є знімком світу: {path}")
+        if version != VERSION:
+            self.close()
+            raise SnapshotError(f"Непідтримувана версія знімка: {version}")
+        if self.player_offset + PLAYER_RECORD.size * self.player_count > len(self.map):
+            self.close()
+            raise SnapshotError(f"Знімок обрізаний: {path}")
+        # Масив поверх mmap без копіювання: сторінки індексу читаються з диска під час пошуку
+        self.room_ids = np.frombuffer(self.map, dtype="<i4", count=self.room_count, offset=self.index_offset)
+
+    def close(self):
+        # mmap не закривається, поки на нього посилається масив індексу
+        self.room_ids = None
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.room_count
+
+    def _room_index(self, room_id):
+        i = int(np.searchsorted(self.room_ids, room_id))
+        if i < self.room_count and self.room_ids[i] == room_id:
+            return i
+        return None
+
+    def _room_record(self, i):
+        return ROOM_RECORD.unpack_from(self.map, self.room_offset + i * ROOM_RECORD.size)
+
+    def _room_dict(self, record):
+        room_id, x, y, width, height, up, down, left, right, visited, _, _ = record
+        links = (_link_from_record(value) for value in (up, down, left, right))
+        return dict(zip(ROOM_COLUMNS, (room_id, x, y, width, height, *links, visited)))
+
+    def room(self, room_id):
+        i = self._room_index(room_id)
+        return None if i is None else self._room_dict(self._room_record(i))
+
+    def rooms(self):
+        for i in range(self.room_count):
+            yield self._room_dict(self._room_record(i))
+
+    def enemies(self, room_id):
+        # Кортежі у порядку ENEMY_COLUMNS, як StorageBackend.load_enemies
+        i = self._room_index(room_id)
+        if i is None:
+            return []
+        start, count = self._room_record(i)[-2:]
+        return [ENEMY_RECORD.unpack_from(self.map, self.enemy_offset + row * ENEMY_RECORD.size)
+                for row in range(start, start + count)]
+
+    def all_enemies(self):
+        return [ENEMY_RECORD.unpack_from(self.map, self.enemy_offset + row * ENEMY_RECORD.size)
+                for row in range(self.enemy_count)]
+
+    def max_enemy_id(self):
+        # Лише стовпець id записів ворогів, без розбору рядків
+        if not self.enemy_count:
+            return 0
+        ids = np.frombuffer(self.map, dtype="<i4", count=self.enemy_count * 7, offset=self.enemy_offset)[::7]
+        return int(ids.max())
+
+    def players(self):
+        players = []
+        for i in range(self.player_count):
+            *values, name = PLAYER_RECORD.unpack_from(self.map, self.player_offset + i * PLAYER_RECORD.size)
+            player = dict(zip(PLAYER_FIELDS, values))
+            player["name"] = name.rstrip(b"\0").decode("utf-8")
+            players.append(player)
+        return players
+
+    def player(self, player_id):
+        for player in self.players():
+            if player["id"] == player_id:
+                return player
+        return None
+
+    def world(self):
+        return {"rooms": list(self.rooms()), "players": self.players(),
+                "enemies": sorted(self.all_enemies())}
+
+
+def export_snapshot(path, backend=None):
+    # Спершу дописуємо чергу записів, щоб знімок містив поточний стан гри
+    persistence.drain()
+    backend = backend or get_backend()
+    return write_snapshot(path, backend.export_world())
+
+
+def import_snapshot(path, backend=None):
+    from models import room_cache
+
+    persistence.drain()
+    backend = backend or get_backend()
+    # Таблиці мають існувати до імпорту (порожня БД при першому запуску)
+    backend.initialize()
+    with SnapshotReader(path) as reader:
+        world = reader.world()
+    backend.import_world(world["rooms"], world["players"], world["enemies"])
+    # Кешовані кімнати і вороги належать до попереднього світу
+    room_cache.clear()
+    return {"rooms": len(world["rooms"]), "enemies": len(world["enemies"]), "players": len(world["players"])}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Знімок світу гри у бінарному файлі")
+    parser.add_argument("command", choices=("export", "import", "info"))
+    parser.add_argument("path")
+    parser.add_argument("--room", type=int, default=None, help="показати кімнату з цим id (для info)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command == "export":
+        counts = export_snapshot(args.path)
+        print(f"Збережено: {counts['rooms']} кімнат, {counts['enemies']} ворогів, {counts['players']} гравців")
+    elif args.command == "import":
+        counts = import_snapshot(args.path)
+        print(f"Завантажено: {counts['rooms']} кімнат, {counts['enemies']} ворогів, {counts['players']} гравців")
+    else:
+        with SnapshotReader(args.path) as reader:
+            print(f"{reader.room_count} кімнат, {reader.enemy_count} ворогів, {reader.player_count} гравців, "
+                  f"{len(reader.map)} байт")
+            if args.room is not None:
+                room = reader.room(args.room)
+                if room is None:
+                    print(f"Кімнату {args.room} не знайдено")
+                    return 1
+                print(room)
+                for row in reader.enemies(args.room):
+                    print(dict(zip(ENEMY_COLUMNS, row)))
+    get_backend().close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
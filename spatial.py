@@ -0,0 +1,106 @@
+import math
+from collections import defaultdict
+import pygame
+
+
+class SpatialHash:
+    # Рівномірна сітка: кожен об'єкт записаний у всі клітинки, які перетинає його прямокутник.
+    # Запит перевіряє лише об'єкти з клітинок навколо точки чи прямокутника
+    def __init__(self, cell_size=100):
+        self.cell_size = cell_size
+        self.cells = defaultdict(set)
+        self.rects = {}
+
+    def _cells(self, rect):
+        size = self.cell_size
+        for cx in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cy in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield cx, cy
+
+    def insert(self, item, rect):
+        rect = pygame.Rect(rect)
+        self.rects[item] = rect
+        for cell in self._cells(rect):
+            self.cells[cell].add(item)
+
+    def remove(self, item):
+        rect = self.rects.pop(item, None)
+        if rect is None:
+            return
+        for cell in self._cells(rect):
+            bucket = self.cells.get(cell)
+            if bucket is not None:
+                bucket.discard(item)
+                if not bucket:
+                    del self.cells[cell]
+
+    def move(self, item, rect):
+        old_rect = self.rects.get(item)
+        rect = pygame.Rect(rect)
+        if old_rect is not None and set(self._cells(old_rect)) == set(self._cells(rect)):
+            self.rects[item] = rect
+            return
+        self.remove(item)
+        self.insert(item, rect)
+
+    def clear(self):
+        self.cells.clear()
+        self.rects.clear()
+
+    def query_point(self, x, y):
+        bucket = self.cells.get((int(x) // self.cell_size, int(y) // self.cell_size), ())
+        return [item for item in bucket if self.rects[item].collidepoint(x, y)]
+
+    def query_rect(self, rect):
+        rect = pygame.Rect(rect)
+        found = set()
+        for cell in self._cells(rect):
+            for item in self.cells.get(cell, ()):
+                if item not in found and self.rects[item].colliderect(rect):
+                    found.add(item)
+        return found
+
+    def nearest(self, x, y, max_distance=None):
+        # Пошук кільцями клітинок навколо точки, поки не знайдеться гарантовано найближчий
+        if not self.rects:
+            return None
+        size = self.cell_size
+        cx, cy = int(x) // size, int(y) // size
+        best, best_distance = None, math.inf
+        max_ring = max(max(abs(gx - cx), abs(gy - cy)) for gx, gy in self.cells)
+        if max_distance is not None:
+            max_ring = min(max_ring, int(max_distance // size) + 1)
+        checked = set()
+        for ring in range(max_ring + 1):
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for item in self.cells.get((gx, gy), ()):
+                        if item in checked:
+                            continue
+                        checked.add(item)
+                        distance = math.hypot(*self._offset(self.rects[item], x, y))
+                        if distance < best_distance:
+                            best, best_distance = item, distance
+            # Усі непереглянуті об'єкти щонайменше на ring * size від точки
+            if best is not None and best_distance <= ring * size:
+                break
+            if len(checked) == len(self.rects):
+                break
+        if max_distance is not None and best_distance > max_distance:
+            return None
+        return best
+
+    @staticmethod
+    def _offset(rect, x, y):
+        # Відстань від точки до прямокутника (0, якщо точка всередині)
+        dx = max(rect.left - x, 0, x - rect.right)
+        dy = max(rect.top - y, 0, y - rect.bottom)
+        return dx, dy
+
+    def __len__(self):
+        return len(self.rects)
+
+    def __contains__(self, item):
+        return item in self.rects
@@ -0,0 +1,82 @@
+import random
+import numpy as np
+from models import Enemy
+
+ENEMY_SIZE = 40
+MIN_ENEMY_SPACING = 60
+PLAYER_SAFE_DISTANCE = 100
+
+
+def wall_mask(room):
+    # True там, де піксель кімнати зайнятий стіною
+    mask = np.zeros((room.height, room.width), dtype=bool)
+    for wall in room.walls:
+        rect = wall.rect.clip((0, 0, room.width, room.height))
+        mask[rect.top:rect.bottom, rect.left:rect.right] = True
+    return mask
+
+
+def spawn_mask(room, size=ENEMY_SIZE):
+    # mask[y, x] = True, якщо квадрат size x size з лівим верхнім кутом (x, y) не торкається стін.
+    # Рахується через таблицю сум (integral image) і кешується в кімнаті разом з індексами вільних позицій
+    return _spawn_data(room, size)[0]
+
+
+def _spawn_data(room, size):
+    data = room.spawn_masks.get(size)
+    if data is None:
+        walls = wall_mask(room).astype(np.int32)
+        integral = np.zeros((room.height + 1, room.width + 1), dtype=np.int32)
+        integral[1:, 1:] = walls.cumsum(axis=0).cumsum(axis=1)
+        blocked = (integral[size:, size:] - integral[:-size, size:]
+                   - integral[size:, :-size] + integral[:-size, :-size])
+        mask = blocked == 0
+        data = (mask, np.flatnonzero(mask))
+        room.spawn_masks[size] = data
+    return data
+
+
+def sample_positions(room, count, size=ENEMY_SIZE, min_spacing=0, avoid=(), avoid_distance=0, rng=None):
+    # Повертає до count вільних позицій (x, y). Надлишок кандидатів береться одним векторним
+    # вибором з кешованих вільних позицій, відстань до точок avoid перевіряється для всіх одразу
+    if count <= 0:
+        return []
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(64))
+
+    mask, free = _spawn_data(room, size)
+    if len(free) == 0:
+        return []
+
+    oversample = 8 if min_spacing > 0 or avoid else 1
+    candidates = rng.choice(free, size=max(count * oversample, count), replace=len(free) < count * oversample)
+    ys, xs = np.divmod(candidates, mask.shape[1])
+
+    if avoid and avoid_distance > 0:
+        far = np.ones(len(candidates), dtype=bool)
+        for ax, ay in avoid:
+            far &= (xs - ax) ** 2 + (ys - ay) ** 2 >= avoid_distance ** 2
+        xs, ys = xs[far], ys[far]
+
+    if min_spacing <= 0:
+        return [(int(x), int(y)) for x, y in zip(xs[:count], ys[:count])]
+
+    # Жадібно беремо кандидатів, що стоять далі min_spacing від уже вибраних
+    chosen = []
+    for x, y in zip(xs, ys):
+        if any((x - cx) ** 2 + (y - cy) ** 2 < min_spacing ** 2 for cx, cy in chosen):
+            continue
+        chosen.append((int(x), int(y)))
+        if len(chosen) == count:
+            break
+    return chosen
+
+
+def spawn_enemies(room, count=1, avoid=None, rng=None):
+    # Розміщення і запис нових ворогів кімнати; спільне для Game, сервера і потоку попередньої генерації,
+    # тому не змінює стан гри. avoid - позиція гравця, біля якої вороги не з'являються
+    positions = sample_positions(room, count, min_spacing=MIN_ENEMY_SPACING,
+                                 avoid=[avoid] if avoid else [], avoid_distance=PLAYER_SAFE_DISTANCE, rng=rng)
+    if len(positions) < count:
+        print("Не вдалося знайти позицію для ворога без зіткнення зі стінами.")
+    return Enemy.create_many([(enemy_x, enemy_y, 50, 10, 5, room.id) for enemy_x, enemy_y in positions])
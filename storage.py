@@ -0,0 +1,839 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from migrations import migrate
+
+# Сховище вибирається конфігурацією: "postgres", "sqlite", "memory" або "snapshot".
+# Змінні оточення дозволяють запускати тести продуктивності та CI без сервера БД
+STORAGE_CONFIG = {
+    "backend": os.environ.get("RPG_STORAGE", "postgres"),
+    "sqlite_path": os.environ.get("RPG_SQLITE_PATH", "game.db"),
+    "snapshot_path": os.environ.get("RPG_SNAPSHOT_PATH", "world.snap")
+}
+
+ROOM_COLUMNS = ("id", "x", "y", "width", "height",
+                "up_room_id", "down_room_id", "left_room_id", "right_room_id", "visited")
+PLAYER_COLUMNS = ("x", "y", "current_room_id", "health", "max_health",
+                  "attack", "defense", "experience", "level", "name")
+ENEMY_COLUMNS = ("id", "x", "y", "health", "attack", "defense", "current_room_id")
+DIRECTIONS = ("up", "down", "left", "right")
+
+START_ROOM = {"x": 0, "y": 0, "width": 800, "height": 600, "up_room_id": None,
+              "down_room_id": None, "left_room_id": None, "right_room_id": -1, "visited": False}
+
+
+class StorageBackend:
+    name = None
+    # Винятки самого сховища (помилки БД), на відміну від помилок у коді гри
+    errors = ()
+
+    def __init__(self):
+        # Кількість звернень до сховища (SQL-запитів) - для бенчмарків і профілювання
+        self.statements = 0
+
+    def initialize(self):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    # link=(prev_room_id, direction) - зворотний зв'язок у попередній кімнаті
+    def insert_room(self, room_data, link=None):
+        raise NotImplementedError
+
+    def load_room(self, room_id):
+        rooms = self.load_rooms([room_id])
+        return rooms[0] if rooms else None
+
+    def load_rooms(self, room_ids):
+        raise NotImplementedError
+
+    def save_room(self, room_data):
+        raise NotImplementedError
+
+    def reset_visited(self):
+        raise NotImplementedError
+
+    def load_player(self, player_id):
+        raise NotImplementedError
+
+    def save_player(self, player_id, player_data):
+        raise NotImplementedError
+
+    # Повертає кортежі у порядку ENEMY_COLUMNS
+    def load_enemies(self, room_ids):
+        raise NotImplementedError
+
+    # rows - кортежі (x, y, health, attack, defense, current_room_id); повертає нові id
+    def create_enemies(self, rows):
+        raise NotImplementedError
+
+    # rows - кортежі (id, x, y)
+    def update_enemy_positions(self, rows):
+        raise NotImplementedError
+
+    def delete_enemy(self, enemy_id):
+        raise NotImplementedError
+
+    def delete_all_enemies(self):
+        raise NotImplementedError
+
+    # Увесь світ одним викликом: {"rooms": [словники ROOM_COLUMNS], "players": [словники з id
+    # та PLAYER_COLUMNS], "enemies": [кортежі ENEMY_COLUMNS]}, кожен список відсортований за id
+    def export_world(self):
+        raise NotImplementedError
+
+    # Замінює весь світ даними у форматі export_world зі збереженням id;
+    # наступні вставки отримують id після найбільшого імпортованого
+    def import_world(self, rooms, players, enemies):
+        raise NotImplementedError
+
+
+class PostgresBackend(StorageBackend):
+    name = "postgres"
+
+    # Гарячі запити - серверні prepared statements (назва -> (типи параметрів, запит)):
+    # розбираються і плануються один раз на з'єднання пулу
+    PREPARED = {
+        "load_rooms": (("integer[]",),
+                       f"SELECT {', '.join(ROOM_COLUMNS)} FROM rooms WHERE id = ANY($1)"),
+        "save_room": (("integer",) * 8 + ("boolean", "integer"), """
+            UPDATE rooms SET
+                x = $1, y = $2, width = $3, height = $4,
+                up_room_id = $5, down_room_id = $6, left_room_id = $7, right_room_id = $8,
+                visited = $9
+            WHERE id = $10
+        """),
+        "load_player": (("integer",),
+                        f"SELECT {', '.join(PLAYER_COLUMNS)} FROM player WHERE id = $1"),
+        "save_player": (("integer",) * 10 + ("varchar",), """
+            INSERT INTO player (id, x, y, health, max_health, attack, defense, experience, level, current_room_id, name)
+            VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11)
+            ON CONFLICT (id) DO UPDATE SET
+                x = EXCLUDED.x,
+                y = EXCLUDED.y,
+                health = EXCLUDED.health,
+                max_health = EXCLUDED.max_health,
+                attack = EXCLUDED.attack,
+                defense = EXCLUDED.defense,
+                experience = EXCLUDED.experience,
+                level = EXCLUDED.level,
+                current_room_id = EXCLUDED.current_room_id,
+                name = EXCLUDED.name
+        """),
+        "load_enemies": (("integer[]",),
+                         f"SELECT {', '.join(ENEMY_COLUMNS)} FROM enemies WHERE current_room_id = ANY($1)"),
+        # Масиви замість VALUES з довільною кількістю рядків: один план для будь-якого розміру пакета
+        "update_enemy_positions": (("integer[]", "integer[]", "integer[]"), """
+            UPDATE enemies SET x = data.x, y = data.y
+            FROM unnest($1, $2, $3) AS data (id, x, y)
+            WHERE enemies.id = data.id
+        """),
+        "delete_enemy": (("integer",), "DELETE FROM enemies WHERE id = $1"),
+    }
+
+    def __init__(self):
+        super().__init__()
+        # Імпорт тут, щоб інші сховища працювали без psycopg2
+        import database
+        self.database = database
+        self.errors = (database.psycopg2.Error,)
+
+    @contextmanager
+    def cursor(self):
+        with self.database.get_db_cursor() as cursor:
+            yield cursor
+
+    def execute(self, cursor, query, params=None):
+        self.statements += 1
+        cursor.execute(query, params)
+
+    def execute_prepared(self, cursor, name, params):
+        self.statements += 1
+        param_types, query = self.PREPARED[name]
+        self.database.execute_prepared(cursor, name, param_types, query, params)
+
+    def initialize(self):
+        self.statements += 1
+        self.database.initialize_database()
+
+    def clear(self):
+        self.statements += 1
+        self.database.clear_database()
+
+    def close(self):
+        self.database.close_db_pool()
+
+    def insert_room(self, room_data, link=None):
+        values = tuple(room_data[column] for column in ROOM_COLUMNS[1:])
+        with self.cursor() as cursor:
+            if link:
+                prev_room_id, direction = link
+                if direction not in DIRECTIONS:
+                    raise ValueError(f"Невідомий напрямок: {direction}")
+                # INSERT нової кімнати та зворотний зв'язок у попередній кімнаті - один запит
+                self.execute(cursor, f"""
+                    WITH inserted AS (
+                        INSERT INTO rooms
+                        (x, y, width, height, up_room_id, down_room_id, left_room_id, right_room_id, visited)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                        RETURNING id
+                    ), linked AS (
+                        UPDATE rooms SET {direction}_room_id = (SELECT id FROM inserted)
+                        WHERE id = %s
+                    )
+                    SELECT id FROM inserted
+                """, values + (prev_room_id,))
+            else:
+                self.execute(cursor, """
+                    INSERT INTO rooms
+                    (x, y, width, height, up_room_id, down_room_id, left_room_id, right_room_id, visited)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING id
+                """, values)
+            return cursor.fetchone()[0]
+
+    def load_rooms(self, room_ids):
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "load_rooms", (list(room_ids),))
+            return [dict(zip(ROOM_COLUMNS, row)) for row in cursor.fetchall()]
+
+    def save_room(self, room_data):
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "save_room",
+                                  tuple(room_data[column] for column in ROOM_COLUMNS[1:]) + (room_data["id"],))
+
+    def reset_visited(self):
+        with self.cursor() as cursor:
+            self.execute(cursor, "UPDATE rooms SET visited = FALSE")
+
+    def load_player(self, player_id):
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "load_player", (player_id,))
+            data = cursor.fetchone()
+            return dict(zip(PLAYER_COLUMNS, data)) if data else None
+
+    def save_player(self, player_id, player_data):
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "save_player", (
+                player_id, player_data["x"], player_data["y"], player_data["health"],
+                player_data["max_health"], player_data["attack"], player_data["defense"],
+                player_data["experience"], player_data["level"], player_data["current_room_id"],
+                player_data["name"]))
+
+    def load_enemies(self, room_ids):
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "load_enemies", (list(room_ids),))
+            return cursor.fetchall()
+
+    def create_enemies(self, rows):
+        from psycopg2.extras import execute_values
+
+        if not rows:
+            return []
+        with self.cursor() as cursor:
+            self.statements += 1
+            result = execute_values(cursor, """
+                INSERT INTO enemies (x, y, health, attack, defense, current_room_id)
+                VALUES %s
+                RETURNING id
+            """, rows, page_size=len(rows), fetch=True)
+            return [row[0] for row in result]
+
+    def update_enemy_positions(self, rows):
+        if not rows:
+            return
+        ids, xs, ys = (list(column) for column in zip(*rows))
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "update_enemy_positions", (ids, xs, ys))
+
+    def delete_enemy(self, enemy_id):
+        with self.cursor() as cursor:
+            self.execute_prepared(cursor, "delete_enemy", (enemy_id,))
+
+    def delete_all_enemies(self):
+        with self.cursor() as cursor:
+            self.execute(cursor, "DELETE FROM enemies")
+
+    def export_world(self):
+        with self.cursor() as cursor:
+            self.execute(cursor, f"SELECT {', '.join(ROOM_COLUMNS)} FROM rooms ORDER BY id")
+            rooms = [dict(zip(ROOM_COLUMNS, row)) for row in cursor.fetchall()]
+            self.execute(cursor, f"SELECT id, {', '.join(PLAYER_COLUMNS)} FROM player ORDER BY id")
+            players = [dict(zip(("id",) + PLAYER_COLUMNS, row)) for row in cursor.fetchall()]
+            self.execute(cursor, f"SELECT {', '.join(ENEMY_COLUMNS)} FROM enemies ORDER BY id")
+            enemies = cursor.fetchall()
+        return {"rooms": rooms, "players": players, "enemies": enemies}
+
+    def import_world(self, rooms, players, enemies):
+        from psycopg2.extras import execute_values
+
+        tables = (
+            ("rooms", ROOM_COLUMNS, [tuple(room[column] for column in ROOM_COLUMNS) for room in rooms]),
+            ("player", ("id",) + PLAYER_COLUMNS,
+             [tuple(player[column] for column in ("id",) + PLAYER_COLUMNS) for player in players]),
+            ("enemies", ENEMY_COLUMNS, [tuple(row) for row in enemies]),
+        )
+        # Одна транзакція: при помилці в БД лишається попередній світ
+        with self.cursor() as cursor:
+            self.execute(cursor, "TRUNCATE TABLE rooms, player, enemies RESTART IDENTITY CASCADE")
+            for table, columns, rows in tables:
+                if rows:
+                    self.statements += 1
+                    execute_values(cursor, f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s",
+                                   rows, page_size=1000)
+                self.execute(cursor, f"""
+                    SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE(MAX(id), 0) + 1, false)
+                    FROM {table}
+                """)
+
+
+class SQLiteBackend(StorageBackend):
+    name = "sqlite"
+    errors = (sqlite3.Error,)
+
+    def __init__(self, path=None):
+        super().__init__()
+        self.path = path or STORAGE_CONFIG["sqlite_path"]
+        # Одне з'єднання на процес; доступ з кількох потоків серіалізується блокуванням
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.lock = threading.RLock()
+
+    @contextmanager
+    def cursor(self):
+        with self.lock:
+            cursor = self.conn.cursor()
+            try:
+                yield cursor
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    def execute(self, cursor, query, params=()):
+        self.statements += 1
+        cursor.execute(query, params)
+
+    def initialize(self):
+        with self.cursor() as cursor:
+            self.statements += 1
+            migrate(cursor, "sqlite")
+            self.execute(cursor, """
+                INSERT INTO rooms (x, y, width, height, right_room_id)
+                SELECT 0, 0, 800, 600, -1
+                WHERE NOT EXISTS (SELECT 1 FROM rooms)
+            """)
+
+    def clear(self):
+        with self.cursor() as cursor:
+            for table in ("rooms", "player", "enemies"):
+                self.execute(cursor, f"DELETE FROM {table}")
+            # Аналог RESTART IDENTITY: лічильники AUTOINCREMENT теж скидаються
+            self.execute(cursor, "DELETE FROM sqlite_sequence")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def insert_room(self, room_data, link=None):
+        values = tuple(room_data[column] for column in ROOM_COLUMNS[1:])
+        with self.cursor() as cursor:
+            self.execute(cursor, """
+                INSERT INTO rooms
+                (x, y, width, height, up_room_id, down_room_id, left_room_id, right_room_id, visited)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, values)
+            room_id = cursor.lastrowid
+            if link:
+                prev_room_id, direction = link
+                if direction not in DIRECTIONS:
+                    raise ValueError(f"Невідомий напрямок: {direction}")
+                self.execute(cursor, f"UPDATE rooms SET {direction}_room_id = ? WHERE id = ?",
+                             (room_id, prev_room_id))
+            return room_id
+
+    def load_rooms(self, room_ids):
+        room_ids = list(room_ids)
+        if not room_ids:
+            return []
+        with self.cursor() as cursor:
+            self.execute(cursor, f"""
+                SELECT {', '.join(ROOM_COLUMNS)} FROM rooms WHERE id IN ({', '.join('?' * len(room_ids))})
+            """, room_ids)
+            rooms = [dict(zip(ROOM_COLUMNS, row)) for row in cursor.fetchall()]
+        for room in rooms:
+            room["visited"] = bool(room["visited"])
+        return rooms
+
+    def save_room(self, room_data):
+        with self.cursor() as cursor:
+            self.execute(cursor, """
+                UPDATE rooms SET
+                    x = ?, y = ?, width = ?, height = ?,
+                    up_room_id = ?, down_room_id = ?, left_room_id = ?, right_room_id = ?,
+                    visited = ?
+                WHERE id = ?
+            """, tuple(room_data[column] for column in ROOM_COLUMNS[1:]) + (room_data["id"],))
+
+    def reset_visited(self):
+        with self.cursor() as cursor:
+            self.execute(cursor, "UPDATE rooms SET visited = 0")
+
+    def load_player(self, player_id):
+        with self.cursor() as cursor:
+            self.execute(cursor, f"SELECT {', '.join(PLAYER_COLUMNS)} FROM player WHERE id = ?", (player_id,))
+            data = cursor.fetchone()
+            return dict(zip(PLAYER_COLUMNS, data)) if data else None
+
+    def save_player(self, player_id, player_data):
+        with self.cursor() as cursor:
+            self.execute(cursor, """
+                INSERT INTO player (id, x, y, health, max_health, attack, defense, experience, level, current_room_id, name)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    x = excluded.x,
+                    y = excluded.y,
+                    health = excluded.health,
+                    max_health = excluded.max_health,
+                    attack = excluded.attack,
+                    defense = excluded.defense,
+                    experience = excluded.experience,
+                    level = excluded.level,
+                    current_room_id = excluded.current_room_id,
+                    name = excluded.name
+            """, (player_id, player_data["x"], player_data["y"], player_data["health"],
+                  player_data["max_health"], player_data["attack"], player_data["defense"],
+                  player_data["experience"], player_data["level"], player_data["current_room_id"],
+                  player_data["name"]))
+
+    def load_enemies(self, room_ids):
+        room_ids = list(room_ids)
+        if not room_ids:
+            return []
+        with self.cursor() as cursor:
+            self.execute(cursor, f"""
+                SELECT {', '.join(ENEMY_COLUMNS)} FROM enemies
+                WHERE current_room_id IN ({', '.join('?' * len(room_ids))})
+            """, room_ids)
+            return cursor.fetchall()
+
+    def create_enemies(self, rows):
+        ids = []
+        with self.cursor() as cursor:
+            # Вбудована БД: окремі INSERT в одній транзакції не потребують мережевих звернень
+            for row in rows:
+                self.execute(cursor, """
+                    INSERT INTO enemies (x, y, health, attack, defense, current_room_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, row)
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def update_enemy_positions(self, rows):
+        if not rows:
+            return
+        with self.cursor() as cursor:
+            self.statements += 1
+            cursor.executemany("UPDATE enemies SET x = ?, y = ? WHERE id = ?",
+                               [(x, y, enemy_id) for enemy_id, x, y in rows])
+
+    def delete_enemy(self, enemy_id):
+        with self.cursor() as cursor:
+            self.execute(cursor, "DELETE FROM enemies WHERE id = ?", (enemy_id,))
+
+    def delete_all_enemies(self):
+        with self.cursor() as cursor:
+            self.execute(cursor, "DELETE FROM enemies")
+
+    def export_world(self):
+        with self.cursor() as cursor:
+            self.execute(cursor, f"SELECT {', '.join(ROOM_COLUMNS)} FROM rooms ORDER BY id")
+            rooms = [dict(zip(ROOM_COLUMNS, row)) for row in cursor.fetchall()]
+            self.execute(cursor, f"SELECT id, {', '.join(PLAYER_COLUMNS)} FROM player ORDER BY id")
+            players = [dict(zip(("id",) + PLAYER_COLUMNS, row)) for row in cursor.fetchall()]
+            self.execute(cursor, f"SELECT {', '.join(ENEMY_COLUMNS)} FROM enemies ORDER BY id")
+            enemies = cursor.fetchall()
+        for room in rooms:
+            room["visited"] = bool(room["visited"])
+        return {"rooms": rooms, "players": players, "enemies": enemies}
+
+    def import_world(self, rooms, players, enemies):
+        tables = (
+            ("rooms", ROOM_COLUMNS, [tuple(room[column] for column in ROOM_COLUMNS) for room in rooms]),
+            ("player", ("id",) + PLAYER_COLUMNS,
+             [tuple(player[column] for column in ("id",) + PLAYER_COLUMNS) for player in players]),
+            ("enemies", ENEMY_COLUMNS, [tuple(row) for row in enemies]),
+        )
+        with self.cursor() as cursor:
+            for table, _, _ in tables:
+                self.execute(cursor, f"DELETE FROM {table}")
+            # Вставка з явними id сама оновлює лічильники AUTOINCREMENT у sqlite_sequence
+            self.execute(cursor, "DELETE FROM sqlite_sequence")
+            for table, columns, rows in tables:
+                self.statements += 1
+                cursor.executemany(f"INSERT INTO {table} ({', '.join(columns)}) "
+                                   f"VALUES ({', '.join('?' * len(columns))})", rows)
+
+
+class MemoryBackend(StorageBackend):
+    name = "memory"
+
+    def __init__(self):
+        super().__init__()
+        self.lock = threading.RLock()
+        self.clear()
+        self.statements = 0
+
+    def initialize(self):
+        with self.lock:
+            self.statements += 1
+            if not self.rooms:
+                self.insert_room(START_ROOM)
+
+    def clear(self):
+        with self.lock:
+            self.statements += 1
+            self.rooms = {}
+            self.players = {}
+            self.enemies = {}
+            self.next_room_id = 1
+            self.next_enemy_id = 1
+
+    def insert_room(self, room_data, link=None):
+        with self.lock:
+            self.statements += 1
+            room_id = self.next_room_id
+            self.next_room_id += 1
+            self.rooms[room_id] = dict(room_data, id=room_id)
+            if link:
+                prev_room_id, direction = link
+                if prev_room_id in self.rooms:
+                    self.rooms[prev_room_id][f"{direction}_room_id"] = room_id
+            return room_id
+
+    def load_rooms(self, room_ids):
+        with self.lock:
+            self.statements += 1
+            return [dict(self.rooms[room_id]) for room_id in room_ids if room_id in self.rooms]
+
+    def save_room(self, room_data):
+        with self.lock:
+            self.statements += 1
+            if room_data["id"] in self.rooms:
+                self.rooms[room_data["id"]] = {column: room_data[column] for column in ROOM_COLUMNS}
+
+    def reset_visited(self):
+        with self.lock:
+            self.statements += 1
+            for room in self.rooms.values():
+                room["visited"] = False
+
+    def load_player(self, player_id):
+        with self.lock:
+            self.statements += 1
+            data = self.players.get(player_id)
+            return dict(data) if data else None
+
+    def save_player(self, player_id, player_data):
+        with self.lock:
+            self.statements += 1
+            self.players[player_id] = {column: player_data[column] for column in PLAYER_COLUMNS}
+
+    def load_enemies(self, room_ids):
+        with self.lock:
+            self.statements += 1
+            room_ids = set(room_ids)
+            return [row for row in self.enemies.values() if row[6] in room_ids]
+
+    def create_enemies(self, rows):
+        with self.lock:
+            self.statements += 1
+            ids = []
+            for row in rows:
+                enemy_id = self.next_enemy_id
+                self.next_enemy_id += 1
+                self.enemies[enemy_id] = (enemy_id,) + tuple(row)
+                ids.append(enemy_id)
+            return ids
+
+    def update_enemy_positions(self, rows):
+        with self.lock:
+            self.statements += 1
+            for enemy_id, x, y in rows:
+                if enemy_id in self.enemies:
+                    row = self.enemies[enemy_id]
+                    self.enemies[enemy_id] = (enemy_id, x, y) + row[3:]
+
+    def delete_enemy(self, enemy_id):
+        with self.lock:
+            self.statements += 1
+            self.enemies.pop(enemy_id, None)
+
+    def delete_all_enemies(self):
+        with self.lock:
+            self.statements += 1
+            self.enemies.clear()
+
+    def export_world(self):
+        with self.lock:
+            self.statements += 1
+            return {
+                "rooms": [dict(self.rooms[room_id]) for room_id in sorted(self.rooms)],
+                "players": [dict(self.players[player_id], id=player_id) for player_id in sorted(self.players)],
+                "enemies": [self.enemies[enemy_id] for enemy_id in sorted(self.enemies)],
+            }
+
+    def import_world(self, rooms, players, enemies):
+        with self.lock:
+            self.statements += 1
+            self.rooms = {room["id"]: {column: room[column] for column in ROOM_COLUMNS} for room in rooms}
+            self.players = {player["id"]: {column: player[column] for column in PLAYER_COLUMNS}
+                            for player in players}
+            self.enemies = {row[0]: tuple(row) for row in enemies}
+            self.next_room_id = max(self.rooms, default=0) + 1
+            self.next_enemy_id = max(self.enemies, default=0) + 1
+
+
+class SnapshotBackend(StorageBackend):
+    # Світ зі знімка snapshot.py без імпорту в БД: кімнати і вороги читаються з файлу (mmap)
+    # лише при зверненні, зміни гри тримаються в пам'яті поверх знімка, а close() записує
+    # змінений світ новим знімком у той самий файл
+    name = "snapshot"
+
+    def __init__(self, path=None):
+        super().__init__()
+        # Імпорт тут: snapshot.py сам імпортує storage
+        from snapshot import SnapshotReader, SnapshotError, write_snapshot
+        self.write_snapshot = write_snapshot
+        self.errors = (OSError, SnapshotError)
+        self.path = path or STORAGE_CONFIG["snapshot_path"]
+        self.lock = threading.RLock()
+        self.reader = SnapshotReader(self.path) if os.path.exists(self.path) else None
+        # Змінені та нові кімнати; кімнати зі знімка копіюються сюди лише при зміні
+        self.rooms = {}
+        # Вороги кімнат, яких уже торкалась гра (кімната -> {id: рядок}), і кімната кожного з них
+        self.enemy_rooms = {}
+        self.enemy_room = {}
+        # False після reset_visited / delete_all_enemies: відповідні дані знімка вже не діють
+        self.base_visited = True
+        self.base_enemies = True
+        self.players = {}
+        self.next_room_id = 1
+        self.next_enemy_id = 1
+        if self.reader is not None:
+            self.players = {player["id"]: {column: player[column] for column in PLAYER_COLUMNS}
+                            for player in self.reader.players()}
+            if len(self.reader):
+                self.next_room_id = int(self.reader.room_ids[-1]) + 1
+            self.next_enemy_id = self.reader.max_enemy_id() + 1
+        self.dirty = False
+
+    def initialize(self):
+        with self.lock:
+            self.statements += 1
+            if not self.rooms and (self.reader is None or not len(self.reader)):
+                self.insert_room(START_ROOM)
+
+    def clear(self):
+        with self.lock:
+            self.statements += 1
+            self.close_reader()
+            self.rooms = {}
+            self.enemy_rooms = {}
+            self.enemy_room = {}
+            self.players = {}
+            self.next_room_id = 1
+            self.next_enemy_id = 1
+            self.dirty = True
+
+    def close_reader(self):
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
+
+    def close(self):
+        with self.lock:
+            if self.dirty:
+                # Світ читається зі старого файлу до заміни: write_snapshot пише тимчасовий файл і підміняє
+                self.write_snapshot(self.path, self.export_world())
+                self.dirty = False
+            self.close_reader()
+
+    def _room(self, room_id):
+        room = self.rooms.get(room_id)
+        if room is not None:
+            return room
+        room = self.reader.room(room_id) if self.reader is not None else None
+        if room is not None and not self.base_visited:
+            room["visited"] = False
+        return room
+
+    def _room_enemies(self, room_id):
+        enemies = self.enemy_rooms.get(room_id)
+        if enemies is None:
+            rows = self.reader.enemies(room_id) if self.reader is not None and self.base_enemies else []
+            enemies = self.enemy_rooms[room_id] = {row[0]: tuple(row) for row in rows}
+            self.enemy_room.update(dict.fromkeys(enemies, room_id))
+        return enemies
+
+    def insert_room(self, room_data, link=None):
+        with self.lock:
+            self.statements += 1
+            room_id = self.next_room_id
+            self.next_room_id += 1
+            self.rooms[room_id] = dict(room_data, id=room_id)
+            if link:
+                prev_room_id, direction = link
+                prev_room = self._room(prev_room_id)
+                if prev_room is not None:
+                    self.rooms[prev_room_id] = dict(prev_room, **{f"{direction}_room_id": room_id})
+            self.dirty = True
+            return room_id
+
+    def load_rooms(self, room_ids):
+        with self.lock:
+            self.statements += 1
+            rooms = (self._room(room_id) for room_id in room_ids)
+            return [dict(room) for room in rooms if room is not None]
+
+    def save_room(self, room_data):
+        with self.lock:
+            self.statements += 1
+            if self._room(room_data["id"]) is not None:
+                self.rooms[room_data["id"]] = {column: room_data[column] for column in ROOM_COLUMNS}
+                self.dirty = True
+
+    def reset_visited(self):
+        with self.lock:
+            self.statements += 1
+            self.base_visited = False
+            for room in self.rooms.values():
+                room["visited"] = False
+            self.dirty = True
+
+    def load_player(self, player_id):
+        with self.lock:
+            self.statements += 1
+            data = self.players.get(player_id)
+            return dict(data) if data else None
+
+    def save_player(self, player_id, player_data):
+        with self.lock:
+            self.statements += 1
+            self.players[player_id] = {column: player_data[column] for column in PLAYER_COLUMNS}
+            self.dirty = True
+
+    def load_enemies(self, room_ids):
+        with self.lock:
+            self.statements += 1
+            return [row for room_id in room_ids for row in self._room_enemies(room_id).values()]
+
+    def create_enemies(self, rows):
+        with self.lock:
+            self.statements += 1
+            ids = []
+            for row in rows:
+                enemy_id = self.next_enemy_id
+                self.next_enemy_id += 1
+                self._room_enemies(row[5])[enemy_id] = (enemy_id,) + tuple(row)
+                self.enemy_room[enemy_id] = row[5]
+                ids.append(enemy_id)
+            self.dirty = True
+            return ids
+
+    def update_enemy_positions(self, rows):
+        with self.lock:
+            self.statements += 1
+            for enemy_id, x, y in rows:
+                # Гра змінює лише ворогів, яких завантажила, тож їхня кімната вже в enemy_rooms
+                room_id = self.enemy_room.get(enemy_id)
+                if room_id is not None:
+                    row = self.enemy_rooms[room_id][enemy_id]
+                    self.enemy_rooms[room_id][enemy_id] = (enemy_id, x, y) + row[3:]
+            self.dirty = True
+
+    def delete_enemy(self, enemy_id):
+        with self.lock:
+            self.statements += 1
+            room_id = self.enemy_room.pop(enemy_id, None)
+            if room_id is not None:
+                self.enemy_rooms[room_id].pop(enemy_id, None)
+                self.dirty = True
+
+    def delete_all_enemies(self):
+        with self.lock:
+            self.statements += 1
+            self.base_enemies = False
+            self.enemy_rooms = {}
+            self.enemy_room = {}
+            self.dirty = True
+
+    def export_world(self):
+        with self.lock:
+            self.statements += 1
+            rooms = {}
+            enemies = []
+            if self.reader is not None:
+                for room in self.reader.rooms():
+                    if not self.base_visited:
+                        room["visited"] = False
+                    rooms[room["id"]] = room
+                if self.base_enemies:
+                    enemies = [row for row in self.reader.all_enemies() if row[6] not in self.enemy_rooms]
+            rooms.update((room_id, dict(room)) for room_id, room in self.rooms.items())
+            for room_enemies in self.enemy_rooms.values():
+                enemies.extend(room_enemies.values())
+            return {
+                "rooms": [rooms[room_id] for room_id in sorted(rooms)],
+                "players": [dict(self.players[player_id], id=player_id) for player_id in sorted(self.players)],
+                "enemies": sorted(enemies),
+            }
+
+    def import_world(self, rooms, players, enemies):
+        with self.lock:
+            self.statements += 1
+            self.close_reader()
+            self.rooms = {room["id"]: {column: room[column] for column in ROOM_COLUMNS} for room in rooms}
+            self.players = {player["id"]: {column: player[column] for column in PLAYER_COLUMNS}
+                            for player in players}
+            self.enemy_rooms = {room_id: {} for room_id in self.rooms}
+            self.enemy_room = {}
+            for row in enemies:
+                self.enemy_rooms.setdefault(row[6], {})[row[0]] = tuple(row)
+                self.enemy_room[row[0]] = row[6]
+            self.base_visited = self.base_enemies = True
+            self.next_room_id = max(self.rooms, default=0) + 1
+            self.next_enemy_id = max(self.enemy_room, default=0) + 1
+            self.dirty = True
+
+
+BACKENDS = {
+    "postgres": PostgresBackend,
+    "sqlite": SQLiteBackend,
+    "memory": MemoryBackend,
+    "snapshot": SnapshotBackend
+}
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = STORAGE_CONFIG["backend"]
+        if name not in BACKENDS:
+            raise ValueError(f"Невідоме сховище: {name}")
+        _backend = BACKENDS[name]()
+    return _backend
+
+
+def set_backend(backend):
+    global _backend
+    _backend = backend
+    return backend
@@ -1,7 +1,12 @@
 import pygame
 import os
+from cache import LRUCache
+from assets import assets, BACKGROUND, WALL, ENEMY
+from persistence import persistence
 
 class Renderer:
+    MAX_DIRTY_RECTS = 64
+
     def __init__(self, game):
         self.game = game
         self.screen = game.screen
@@ -9,116 +14,228 @@ class Renderer:
         self.HEIGHT = game.HEIGHT
         self.font = game.font
         self.stats_font = game.stats_font
-
-        images_path = os.path.join('images')
-        pygame.display.flip()
-
-        # Завантаження фону
-        self.background_img = pygame.image.load(os.path.join(images_path, 'background.png')).convert()
-        self.background_img = pygame.transform.scale(self.background_img, (self.WIDTH, self.HEIGHT))
-
-        # Завантаження зображення стіни
-        self.wall_img = pygame.image.load(os.path.join(images_path, 'wall.png')).convert_alpha()
-
-        self.enemy_img = pygame.image.load(os.path.join(images_path, 'enemy.png')).convert_alpha()
-        self.enemy_img = pygame.transform.scale(self.enemy_img, (40, 40)) 
-        self.enemy_img.set_colorkey((255, 255, 255))  
+        self.input_font = game.font
+
+        # Кеш відрендереного тексту (шрифт, текст, колір) та останні стани HUD
+        self.text_cache = LRUCache(maxsize=256)
+        self.stats_key = None
+        self.stats_surfaces = []
+        self.messages_key = None
+        self.message_surfaces = []
+
+        # Зображення завантажуються менеджером ресурсів при першому малюванні
+        self.assets = assets
+
+        # Статичний шар кімнати (фон + стіни) та прямокутники, змінені за кадр
+        self.static_layer = None
+        self.static_room = None
+        self.full_redraw = True
+        self.dirty_rects = []
+        self.drawn_rects = []
+        self.prev_rects = []
+
+    def scaled(self, path, size, alpha=True, colorkey=None):
+        return self.assets.scaled(path, size, alpha, colorkey)
+
+    @property
+    def enemy_img(self):
+        # Зображення без альфа-каналу: blit з colorkey на непрозорій поверхні в рази швидший
+        return self.scaled(ENEMY, (40, 40), alpha=False, colorkey=(255, 255, 255))
+
+    def render_text(self, font, text, colour):
+        key = (font, text, colour)
+        surface = self.text_cache.get(key)
+        if surface is None:
+            surface = font.render(text, True, colour)
+            self.text_cache.put(key, surface)
+        return surface
+
+    def build_static_layer(self):
+        room = self.game.current_room
+        layer = pygame.Surface((self.WIDTH, self.HEIGHT)).convert()
+        layer.blit(self.scaled(BACKGROUND, (self.WIDTH, self.HEIGHT), alpha=False), (0, 0))
+        for wall in room.walls:
+            wall_rect = wall.rect
+            layer.blit(self.scaled(WALL, wall_rect.size), wall_rect)
+        self.static_layer = layer
+        self.static_room = room
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def blit(self, surface, dest):
+        rect = self.screen.blit(surface, dest)
+        self.drawn_rects.append(rect)
+        return rect
+
+    def track(self, rect):
+        if rect is not None:
+            self.drawn_rects.append(rect)
+
+    def restore_background(self):
+        # Статичний шар перемальовується лише при зміні кімнати; в інших кадрах
+        # відновлюється тільки фон під рухомими об'єктами минулого кадру
+        if self.static_room is not self.game.current_room:
+            self.build_static_layer()
+            self.full_redraw = True
+
+        # Коли рухомих об'єктів багато (щільні кімнати), дешевше перемалювати весь фон
+        if len(self.prev_rects) > self.MAX_DIRTY_RECTS:
+            self.full_redraw = True
+
+        if self.full_redraw:
+            self.screen.blit(self.static_layer, (0, 0))
+            self.dirty_rects.append(self.screen.get_rect())
+            self.full_redraw = False
+        else:
+            for rect in self.prev_rects:
+                self.screen.blit(self.static_layer, rect, rect)
+            self.dirty_rects.extend(self.prev_rects)
 
     def draw_room(self):
-        self.screen.blit(self.background_img, (0, 0))
-
-        for wall in self.game.current_room.walls:
-            wall_rect = wall.rect
-            wall_image = pygame.transform.scale(self.wall_img, (wall_rect.width, wall_rect.height))
-            self.screen.blit(wall_image, wall_rect)
+        self.restore_background()
         
         self.game.player.sprite.update_animation(self.game.player.direction)
-        self.game.player.sprite.draw(self.screen, self.game.player.x, self.game.player.y)
+        self.track(self.game.player.sprite.draw(self.screen, self.game.player.x, self.game.player.y))
 
         if self.game.game_state != 'battle':
-            for enemy in self.game.enemies:
-                enemy_rect = self.enemy_img.get_rect(center=(enemy.x + 20, enemy.y + 20))
-                self.screen.blit(self.enemy_img, enemy_rect)
+            self.drawn_rects.extend(self.game.enemies.draw(self.screen, self.enemy_img))
 
         self.draw_player_stats()
         self.display_messages()
 
         if self.game.game_state == 'battle' and self.game.current_battle:
-            enemy_hp_text = self.stats_font.render(f"HP ворога: {self.game.current_battle.enemy.health}", True, (255, 0, 0))
+            enemy_hp_text = self.render_text(self.stats_font, f"HP ворога: {self.game.current_battle.enemy.health}", (255, 0, 0))
             enemy_hp_rect = enemy_hp_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT // 2 - 50))
-            self.screen.blit(enemy_hp_text, enemy_hp_rect)
-        pygame.display.flip()
+            self.blit(enemy_hp_text, enemy_hp_rect)
+
+    def present(self):
+        # Один виклик display.update на кадр лише для змінених ділянок
+        if len(self.dirty_rects) == 1 and self.dirty_rects[0] == self.screen.get_rect():
+            pygame.display.update(self.dirty_rects)
+        else:
+            pygame.display.update(self.dirty_rects + self.drawn_rects)
+        self.prev_rects = self.drawn_rects
+        self.dirty_rects = []
+        self.drawn_rects = []
 
     def draw_player_stats(self):
-        name_text = self.stats_font.render(f"{self.game.player.name} (Рівень {self.game.player.level})", True, (255, 255, 255))
-        name_rect = name_text.get_rect(center=(self.WIDTH // 2, 10))
-        self.screen.blit(name_text, name_rect)
-
-        hp_text = self.stats_font.render(f"HP: {self.game.player.health}/{self.game.player.max_health}", True, (255, 0, 0))
-        hp_rect = hp_text.get_rect(center=(self.WIDTH // 2, 40))
-        self.screen.blit(hp_text, hp_rect)
+        player = self.game.player
+        key = (player.name, player.level, player.health, player.max_health)
+        # Текст перерендерюється лише коли змінились ім'я, рівень або HP
+        if key != self.stats_key:
+            name_text = self.render_text(self.stats_font, f"{player.name} (Рівень {player.level})", (255, 255, 255))
+            hp_text = self.render_text(self.stats_font, f"HP: {player.health}/{player.max_health}", (255, 0, 0))
+            self.stats_surfaces = [
+                (name_text, name_text.get_rect(center=(self.WIDTH // 2, 10))),
+                (hp_text, hp_text.get_rect(center=(self.WIDTH // 2, 40)))
+            ]
+            self.stats_key = key
+
+        for surface, rect in self.stats_surfaces:
+            self.blit(surface, rect)
 
     def display_messages(self):
-        current_time = pygame.time.get_ticks()
-        self.game.messages = [(text, timestamp) for text, timestamp in self.game.messages if current_time - timestamp < self.game.message_duration]
-
+        # Застарілі повідомлення прибирає планувальник (Game.expire_messages)
         max_messages_to_display = 3
-        for i, (text, _) in enumerate(reversed(self.game.messages[-max_messages_to_display:])):
-            message_text = self.font.render(text, True, (255, 255, 255))
-            message_rect = message_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT - 20 - i * 30))
-            self.screen.blit(message_text, message_rect)
+        key = tuple(text for text, _ in self.game.messages[-max_messages_to_display:])
+        if key != self.messages_key:
+            self.message_surfaces = []
+            for i, text in enumerate(reversed(key)):
+                message_text = self.render_text(self.font, text, (255, 255, 255))
+                message_rect = message_text.get_rect(center=(self.WIDTH // 2, self.HEIGHT - 20 - i * 30))
+                self.message_surfaces.append((message_text, message_rect))
+            self.messages_key = key
+
+        for surface, rect in self.message_surfaces:
+            self.blit(surface, rect)
+
+    def draw_profiler_overlay(self, profiler):
+        worst_name, worst_ms = profiler.worst_phase()
+        lines = [
+            f"FPS: {self.game.clock.get_fps() or profiler.fps():.0f}",
+            f"p50: {profiler.percentile(0.5):.1f} ms  p99: {profiler.percentile(0.99):.1f} ms",
+            f"Найдовша фаза: {worst_name} ({worst_ms:.2f} ms)",
+            f"Запитів до БД/кадр: {profiler.db_statements_per_frame():.2f}",
+            f"Черга запису: {persistence.depth()} (макс. {persistence.max_depth})"
+        ]
+        overlay = pygame.Surface((330, 20 * len(lines) + 10), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 160))
+        for i, line in enumerate(lines):
+            # Рядки накладки змінюються щокадру, тому не засмічують кеш тексту
+            overlay.blit(self.stats_font.render(line, True, (0, 255, 0)), (5, 5 + i * 20))
+        self.blit(overlay, (5, 5))
 
     def draw_text_input(self, text):
         input_box = pygame.Rect(self.WIDTH // 2 - 100, self.HEIGHT // 2 - 20, 200, 40)
         pygame.draw.rect(self.screen, (255, 255, 255), input_box)
-        font = pygame.font.Font(None, 36)
-        text_surface = font.render(text, True, (0, 0, 0))
+        font = self.input_font
+        text_surface = self.render_text(font, text, (0, 0, 0))
         self.screen.blit(text_surface, (input_box.x + 10, input_box.y + 5))
-        prompt_surface = font.render("Введіть ім'я персонажа:", True, (255, 255, 255))
+        prompt_surface = self.render_text(font, "Введіть ім'я персонажа:", (255, 255, 255))
         self.screen.blit(prompt_surface, (self.WIDTH // 2 - 150, self.HEIGHT // 2 - 60))
+        # Екран введення малюється повністю, після нього кімнату треба перемалювати цілком
+        self.dirty_rects.append(self.screen.get_rect())
+        self.invalidate()
 
         
     
 
 class PlayerSprite:
-    def __init__(self, sprite_sheet_path):
+    def __init__(self, sprite_sheet_path, clock=None):
+        self.clock = clock
         if not os.path.isfile(sprite_sheet_path):
             print(f"Помилка: Файл {sprite_sheet_path} не знайдено!")
             return
         
-        self.sprite_sheet = pygame.image.load(sprite_sheet_path).convert_alpha()
-        self.frame_width = self.sprite_sheet.get_width() // 4  
-        self.frame_height = self.sprite_sheet.get_height() // 4  
-        self.animations = self.load_sprites()
-        self.current_animation = self.animations["down"]
+        # Кадри завантажуються при першому використанні та спільні для всіх спрайтів з цим листом
+        self.sprite_sheet_path = sprite_sheet_path
+        self._animations = None
+        self.direction = "down"
         self.frame_index = 0
-        self.last_update = pygame.time.get_ticks()
+        self.last_update = self.now()
         self.frame_delay = 150  
-    def load_sprites(self):
-        animations = {
-            "down": [], "left": [], "right": [], "up": []
-        }
-        directions = ["down", "left", "right", "up"]
+        self.columns = 4
+        self.timer = None
+
+    def now(self):
+        return self.clock.now() if self.clock else pygame.time.get_ticks()
+
+    def attach(self, scheduler):
+        # Кадри перемикає таймер планувальника замість перевірки часу в кожному кадрі
+        if self.timer is not None:
+            self.timer.cancel()
+        self.clock = scheduler.clock
+        self.timer = scheduler.call_every(self.frame_delay, self.next_frame)
 
-        for row, direction in enumerate(directions):
-            for col in range(4): 
-                frame = self.sprite_sheet.subsurface(
-                    pygame.Rect(col * self.frame_width, row * self.frame_height, self.frame_width, self.frame_height)
-                )
-                animations[direction].append(frame)
+    def next_frame(self):
+        self.frame_index = (self.frame_index + 1) % self.columns
 
-        return animations
+    @property
+    def animations(self):
+        if self._animations is None:
+            self._animations = self.load_sprites()
+        return self._animations
+
+    @property
+    def current_animation(self):
+        return self.animations[self.direction]
+
+    def load_sprites(self):
+        return assets.sprite_frames(self.sprite_sheet_path, directions=("down", "left", "right", "up"), columns=self.columns)
 
     def update_animation(self, direction):
-        self.current_animation = self.animations[direction]
-        current_time = pygame.time.get_ticks()
+        self.direction = direction
+        if self.timer is not None:
+            return
+        current_time = self.now()
 
         if current_time - self.last_update > self.frame_delay:
             self.frame_index = (self.frame_index + 1) % len(self.current_animation)
             self.last_update = current_time
 
     def draw(self, screen, x, y):
-        screen.blit(self.current_animation[self.frame_index], (x, y))
+        return screen.blit(self.current_animation[self.frame_index], (x, y))
 
 
 